@@ -1,9 +1,11 @@
+import collections
+import contextlib
 import copy
 from itertools import starmap
 
 from discord.ext import commands
 
-from utils import db
+from utils import cache, db
 from utils.examples import _get_static_example
 from utils.paginator import Paginator
 
@@ -25,6 +27,74 @@ def _first_word_is_command(group, string):
     return _first_word(string) in group.all_commands
 
 
+class _AliasTrie:
+    """A word-level prefix tree of the aliases of a guild.
+
+    Aliases are matched like the old `content ILIKE alias || ' %' OR content = alias` query,
+    except that the longest alias wins.
+    """
+
+    __slots__ = ('_root', '_depth', '_size')
+
+    def __init__(self, records=()):
+        self._root = {}
+        self._depth = 0
+        self._size = 0
+
+        for alias, command in records:
+            self[alias] = command
+
+    def __len__(self):
+        return self._size
+
+    def __setitem__(self, alias, command):
+        words = alias.split(' ')
+        node = self._root
+        for word in words:
+            node = node.setdefault(word, {})
+
+        # Words are always strings, so None can't clash with them.
+        self._size += None not in node
+        node[None] = command
+        self._depth = max(self._depth, len(words))
+
+    def __delitem__(self, alias):
+        path = []
+        node = self._root
+        for word in alias.split(' '):
+            path.append((node, word))
+            node = node[word]
+
+        del node[None]
+        self._size -= 1
+
+        # Prune the branches that lead to nowhere now.
+        for parent, word in reversed(path):
+            if parent[word]:
+                break
+            del parent[word]
+
+    def match(self, content):
+        """Returns an (alias, command) tuple for the longest alias the content starts with, or None."""
+
+        if not self._size:
+            return None
+
+        node = self._root
+        match = None
+        end = -1
+        for word in content.split(' ', self._depth)[:self._depth]:
+            node = node.get(word.lower())
+            if node is None:
+                break
+
+            end += len(word) + 1
+            if None in node:
+                match = content[:end], node[None]
+
+        return match
+
+
 class AliasName(commands.Converter):
     async def convert(self, ctx, argument):
         lower = argument.lower().strip()
@@ -57,6 +127,18 @@ class AliasCommand(commands.Converter):
 class Aliases(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self._stats = collections.Counter()
+
+        self.bot.invalidation.subscribe('aliases', self._get_aliases.invalidate)
+
+    def cog_unload(self):
+        self.bot.invalidation.unsubscribe('aliases', self._get_aliases.invalidate)
+
+    @property
+    def queries_avoided(self):
+        """The number of alias lookups that were answered without querying the database."""
+
+        return self._stats['lookups'] - self._stats['queries']
 
     @commands.group(name='alias', invoke_without_command=True)
     async def _alias(self, ctx, alias: AliasName, *, command: AliasCommand):
@@ -82,6 +164,8 @@ class Aliases(commands.Cog):
             DO UPDATE SET command = $3;
         """
         await ctx.db.execute(query, ctx.guild.id, alias, command)
+        aliases = await self._get_aliases(ctx.guild.id)
+        aliases[alias] = command
 
         await ctx.send(f'Ok, "{ctx.prefix}{alias}" will now have the same result as "{ctx.prefix}{command}".')
 
@@ -96,6 +180,10 @@ class Aliases(commands.Cog):
         """
         await ctx.db.execute(query, ctx.guild.id, alias)
 
+        aliases = await self._get_aliases(ctx.guild.id)
+        with contextlib.suppress(KeyError):
+            del aliases[alias]
+
         await ctx.send(f'Alias `{alias}` was successfully deleted.')
 
     @_alias.command(name='show')
@@ -111,33 +199,26 @@ class Aliases(commands.Cog):
         pages = Paginator(ctx, entries)
         await pages.interact()
 
-    async def _get_alias(self, guild_id, content, *, con=None):
-        con = con or self.bot.pool
-        query = """
-            SELECT   alias, command FROM command_aliases
-            WHERE    guild_id = $1
-            AND      ($2 ILIKE alias || ' %' OR $2 = alias)
-            ORDER BY length(alias)
-            LIMIT    1;
-        """
-        return await con.fetchrow(query, guild_id, content)
+    @cache.cache(max_size=1024, make_key=lambda a, kw: a[-1])
+    async def _get_aliases(self, guild_id):
+        self._stats['queries'] += 1
 
-    def _get_prefix(self, message):
-        # The fucking good old way of doing shitty things with shitty methods
-        prefixes = self.bot.get_guild_prefixes(message.guild)
-        return next(filter(message.content.startswith, prefixes), None)
+        query = 'SELECT alias, command FROM command_aliases WHERE guild_id = $1;'
+        return _AliasTrie(await self.bot.pool.fetch(query, guild_id))
 
     @commands.Cog.listener()
     async def on_message(self, message):
         if not message.guild:
             return
 
-        prefix = self._get_prefix(message)
+        prefix = self.bot.match_prefix(message)
         if not prefix:
             return
         len_prefix = len(prefix)
 
-        row = await self._get_alias(message.guild.id, message.content[len_prefix:])
+        self._stats['lookups'] += 1
+        aliases = await self._get_aliases(message.guild.id)
+        row = aliases.match(message.content[len_prefix:])
         if not row:
             return
 
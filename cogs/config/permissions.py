@@ -167,12 +167,89 @@ _plonk_embed_mappings = {
 PLONK_ICON = emoji_url('\N{HAMMER}')
 
 
+def _node_rank(name):
+    # How specific a node is. A command always has a higher rank than its parents,
+    # which have a higher rank than the category, which has a higher rank than "all commands".
+    if name == ALL_COMMANDS_KEY:
+        return 0
+
+    _, dot, qualified_name = _extract_from_node(name)
+    if not dot:
+        return 1
+
+    return 1 + len(qualified_name.split())
+
+
+class _PermissionTable:
+    """The compiled permissions of a guild.
+
+    Every node that appears in the guild's permissions gets a bit, ordered by how specific the node is.
+    Each user, role and channel is compiled into an (allowed, denied) pair of bitsets over these nodes,
+    so resolving a command for an object is just a few bitwise operations: the highest bit that is set
+    in both the command's mask and the object's bitsets is the most specific node that applies.
+    """
+
+    __slots__ = ('_names', '_bits', '_masks', '_command_masks')
+
+    def __init__(self, records):
+        self._names = sorted({name for name, _, _ in records}, key=lambda name: (_node_rank(name), name))
+        self._bits = {name: 1 << index for index, name in enumerate(self._names)}
+
+        masks = defaultdict(lambda: [0, 0])
+        for name, snowflake, whitelist in records:
+            masks[snowflake][not whitelist] |= self._bits[name]
+
+        self._masks = {snowflake: tuple(pair) for snowflake, pair in masks.items()}
+        self._command_masks = {}
+
+    def __bool__(self):
+        return bool(self._masks)
+
+    def __contains__(self, snowflake):
+        return snowflake in self._masks
+
+    def command_mask(self, names):
+        """Returns the bitset of all the given command nodes that are present in this table."""
+
+        try:
+            return self._command_masks[names]
+        except KeyError:
+            bits = self._bits
+            mask = self._command_masks[names] = sum(bits[name] for name in set(names) if name in bits)
+            return mask
+
+    def resolve(self, snowflake, mask):
+        """Returns a (name, whitelisted) tuple for the most specific node of the mask that applies to the snowflake.
+
+        If no node applies, None is returned.
+        """
+
+        try:
+            allowed, denied = self._masks[snowflake]
+        except KeyError:
+            return None
+
+        hits = (allowed | denied) & mask
+        if not hits:
+            return None
+
+        bit = hits.bit_length() - 1
+        return self._names[bit], bool(allowed >> bit & 1)
+
+
 class Permissions(commands.Cog):
     """Used for enabling or disabling commands for a channel, member, role or even the whole server."""
 
     def __init__(self, bot):
         self.bot = bot
 
+        self.bot.invalidation.subscribe('permissions', self._get_permissions.invalidate)
+        self.bot.invalidation.subscribe('plonks', self._get_ignored.invalidate)
+
+    def cog_unload(self):
+        self.bot.invalidation.unsubscribe('permissions', self._get_permissions.invalidate)
+        self.bot.invalidation.unsubscribe('plonks', self._get_ignored.invalidate)
+
     async def bot_check_once(self, ctx):
         if not ctx.guild:
             return True
@@ -180,9 +257,8 @@ class Permissions(commands.Cog):
         if await ctx.bot.is_owner(ctx.author):
             return True
 
-        query = 'SELECT 1 FROM plonks WHERE guild_id = $1 AND entity_id IN ($2, $3) LIMIT 1;'
-        row = await ctx.db.fetchrow(query, ctx.guild.id, ctx.author.id, ctx.channel.id)
-        return row is None
+        ignored = await self._get_ignored(ctx.guild.id)
+        return ctx.author.id not in ignored and ctx.channel.id not in ignored
 
     async def on_command_error(self, ctx, error):
         if isinstance(error, (PermissionDenied, InvalidPermissions)):
@@ -254,19 +330,18 @@ class Permissions(commands.Cog):
 
     async def _set_permissions(self, connection, guild_id, name, *entities, whitelist):
         method = self._set_one_permission if len(entities) == 1 else self._bulk_set_permissions
-        await method(connection, guild_id, name, *entities, whitelist=whitelist)
+        try:
+            await method(connection, guild_id, name, *entities, whitelist=whitelist)
+        finally:
+            self.bot.invalidation.publish('permissions', guild_id)
 
-    @cache.cache(max_size=None, make_key=lambda a, kw: a[-1])
+    # The TTL is only a fallback for changes made outside of this cog, every write path here invalidates explicitly.
+    @cache.cache(max_size=1024, make_key=lambda a, kw: a[-1], ttl=30 * 60)
     async def _get_permissions(self, connection, guild_id):
         query = 'SELECT name, snowflake, whitelist FROM permissions WHERE guild_id = $1;'
         records = await connection.fetch(query, guild_id)
 
-        lookup = defaultdict(lambda: (set(), set()))
-        for name, snowflake, whitelist in records:
-            lookup[snowflake][whitelist].add(name)
-
-        # Converting this into a dict for future retrievals of this via cache
-        return dict(lookup)
+        return _PermissionTable(records)
 
     async def __global_check(self, ctx):
         if not ctx.guild:  # Custom permissions in DMs? Nope
@@ -275,40 +350,42 @@ class Permissions(commands.Cog):
         if await ctx.bot.is_owner(ctx.author):
             return True
 
-        lookup = await self._get_permissions(ctx.db, ctx.guild.id)
-        if not lookup:
+        table = await self._get_permissions(ctx.db, ctx.guild.id)
+        if not table:
             return True
 
         root = ctx.command.root_parent or ctx.command
         if root in {self.enable, self.disable, self.reset}:
             return True
 
-        server = Server(ctx.guild)
+        names = (
+            *map(_command_node, walk_parents(ctx.command)),
+            command_category(ctx.command),
+            ALL_COMMANDS_KEY,
+        )
+        mask = table.command_mask(names)
+        if not mask:
+            return True
 
+        # Only the roles that actually have a say need to be sorted.
+        roles = sorted((role for role in ctx.author.roles if role.id in table), reverse=True)
         objects = itertools.chain(
             [('user', ctx.author)],
-            zip(itertools.repeat('role'), sorted(ctx.author.roles, reverse=True)),
+            zip(itertools.repeat('role'), roles),
             [('channel', ctx.channel),
-             ('server', server)],
+             ('server', Server(ctx.guild))],
         )
 
-        parent = command_category(ctx.command)
-        names = itertools.chain(
-            map(_command_node, walk_parents(ctx.command)),
-            (parent, ALL_COMMANDS_KEY)
-        )
-
-        # Ew, shit, now the real crap begins
-
-        for (typename, obj), name in itertools.product(objects, names):
-            if obj.id not in lookup:
+        for typename, obj in objects:
+            decision = table.resolve(obj.id, mask)
+            if decision is None:
                 continue
 
-            if name in lookup[obj.id][True]:
+            name, whitelisted = decision
+            if whitelisted:
                 return True
 
-            if name in lookup[obj.id][False]:
-                raise PermissionDenied(f'{name} is denied on the {typename} level', name, obj)
+            raise PermissionDenied(f'{name} is denied on the {typename} level', name, obj)
 
         return True
 
@@ -348,7 +425,6 @@ class Permissions(commands.Cog):
         entities = entities or (Server(ctx.guild), )
 
         await self._set_permissions(ctx.db, ctx.guild.id, name, *entities, whitelist=whitelist)
-        self._get_permissions.invalidate(None, None, ctx.guild.id)
 
         await self._display_embed(ctx, name, *entities, whitelist=whitelist, _type=_type)
 
@@ -404,14 +480,20 @@ class Permissions(commands.Cog):
 
         query = 'DELETE FROM permissions WHERE guild_id = $1;'
         await ctx.db.execute(query, ctx.guild.id)
-        self._get_permissions.invalidate(None, None, ctx.guild.id)
+        self.bot.invalidation.publish('permissions', ctx.guild.id)
 
         await self._display_embed(ctx, None, Server(ctx.guild), whitelist=-1, _type='All permissions')
 
-    async def _bulk_ignore_entries(self, ctx, entries):
-        query = 'SELECT entitiy_id FROM plonks WHERE guild_id = $1;'
+    @cache.cache(max_size=1024, make_key=lambda a, kw: a[-1])
+    async def _get_ignored(self, guild_id):
+        # This is checked before every command, so it uses the pool directly to not force a connection onto the context.
+        query = 'SELECT entity_id FROM plonks WHERE guild_id = $1;'
+        records = await self.bot.pool.fetch(query, guild_id)
 
-        ignored = {result[0] for result in await ctx.db.fetch(query, ctx.guild.id)}
+        return frozenset(entity_id for entity_id, in records)
+
+    async def _bulk_ignore_entries(self, ctx, entries):
+        ignored = await self._get_ignored(ctx.guild.id)
         to_insert = [(ctx.guild.id, entry.id) for entry in entries if entry.id not in ignored]
 
         await ctx.db.copy_records_to_table('plonks', columns=('guild_id', 'entity_id'), records=to_insert)
@@ -463,6 +545,7 @@ class Permissions(commands.Cog):
         else:
             await self._bulk_ignore_entries(ctx, channels_or_members)
 
+        self.bot.invalidation.publish('plonks', ctx.guild.id)
         await self._display_plonked(ctx, channels_or_members, plonk=True)
 
     @commands.command(name='unignore', aliases=['unplonk'])
@@ -481,6 +564,7 @@ class Permissions(commands.Cog):
             query = 'DELETE FROM plonks WHERE guild_id = $1 AND entity_id = ANY($2::BIGINT[]);'
             await ctx.db.execute(query, ctx.guild.id, [entity.id for entity in entities])
 
+        self.bot.invalidation.publish('plonks', ctx.guild.id)
         await self._display_plonked(ctx, entities, plonk=False)
 
     @commands.command(name='ignores', aliases=['plonks'])
@@ -159,7 +159,7 @@ class NonBlacklistedMember(commands.MemberConverter):
         blacklist = ctx.bot.get_cog('Blacklists')
 
         if blacklist:
-            if await blacklist.get_blacklist(member, connection=ctx.db):
+            if blacklist.is_blacklisted(member.id):
                 raise commands.BadArgument('This user is blacklisted.')
 
         return member
@@ -8,6 +8,8 @@ import aiohttp
 import discord
 from discord.ext import commands
 
+from core.context import no_connection
+
 logger = logging.getLogger(__name__)
 
 
@@ -184,6 +186,7 @@ class Fun(commands.Cog, IdiotClient):
                 await ctx.send(file=discord.File(res, 'osu.png'))
 
     @commands.command(name='lmgtfy', aliases=['google', 'search'])
+    @no_connection
     async def _lmgtfy(self, ctx, *args):
         """Use this command if someone is unable to google for stuff on his own."""
 
@@ -194,6 +197,7 @@ class Fun(commands.Cog, IdiotClient):
         await ctx.send(f'Someone who doesn\'t know how to google, huh? Let me show you how to do this. <http://lmgtfy.com/?iie=1&q={query}>')
 
     @commands.command(name='mock')
+    @no_connection
     async def _mock(self, ctx, *, text):
         """Who doesn't like the Spongebob mock meme?"""
 
@@ -158,7 +158,8 @@ class Meta(commands.Cog):
         commits = await self._get_commits('itsVale/Vale.py')
         system = self._get_os_information(cpu, memory)
         python = platform.python_version()
-        postgres = '.'.join(map(str, ctx.db.get_server_version()[:3]))
+        connection = await ctx.acquire()
+        postgres = '.'.join(map(str, connection.get_server_version()[:3]))
 
         pages = [
             (
@@ -116,7 +116,7 @@ async def _get_message(channel, message_id):
     return msg
 
 
-@cache.cache(max_size=None, make_key=lambda a, kw: a[-1])
+@cache.cache(max_size=None, make_key=lambda a, kw: a[-1], ttl=60 * 60, max_memory=2 ** 18)
 async def _get_number_of_cases(connection, guild_id):
     query = 'SELECT COUNT(*) FROM modlog WHERE guild_id = $1;'
     row = await connection.fetchrow(query, guild_id)
@@ -153,8 +153,11 @@ class ModLog(commands.Cog):
         self._cache_locks = collections.defaultdict(asyncio.Event)
         self._cache = set()
 
+        self.bot.invalidation.subscribe('modlog', _get_number_of_cases.invalidate)
+
     def cog_unload(self):
         self._cache_cleaner.cancel()
+        self.bot.invalidation.unsubscribe('modlog', _get_number_of_cases.invalidate)
 
     async def _clean_cache(self):
         while True:
@@ -263,7 +266,7 @@ class ModLog(commands.Cog):
 
             await connection.copy_records_to_table('modlog_targets', columns=columns, records=to_insert)
 
-        _get_number_of_cases.invalidate(None, guild_id)
+        self.bot.invalidation.publish('modlog', guild_id)
 
     @staticmethod
     async def _notify_user(config, action, guild, user, targets, reason, extra=None, auto=False):
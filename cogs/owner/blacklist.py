@@ -1,3 +1,5 @@
+import asyncio
+import logging
 from datetime import datetime
 
 import asyncpg
@@ -6,8 +8,16 @@ from discord.ext import commands
 
 from utils import db, disambiguate
 from utils.colors import random_color
+from utils.formats import pluralize
 from utils.misc import emoji_url, truncate
 
+logger = logging.getLogger(__name__)
+
+# How long commands wait for the blacklist to be loaded before they're rejected, in seconds.
+LOAD_TIMEOUT = 10
+# The longest time between two attempts to load the blacklist, in seconds.
+MAX_LOAD_RETRY_DELAY = 5 * 60
+
 
 class Blacklist(db.Table):
     snowflake = db.Column(db.BigInt, primary_key=True)
@@ -42,6 +52,16 @@ class Blacklists(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+        # snowflake -> reason. Checked on every single command, so this must never hit the database.
+        self._blacklist = {}
+        self._ready = asyncio.Event()
+        # Held while the table is read or changed, so a reload can't overwrite a change that happened while it was fetching.
+        self._lock = asyncio.Lock()
+        self._loader = self.bot.loop.create_task(self._load_blacklist())
+
+    def cog_unload(self):
+        self._loader.cancel()
+
     @property
     def emojis(self):
         return self.bot.bot_emojis
@@ -50,16 +70,22 @@ class Blacklists(commands.Cog):
         return await ctx.bot.is_owner(ctx.author)
 
     async def bot_check_once(self, ctx):
-        row = await self.get_blacklist(ctx.author.id, con=ctx.db)
-        if row:
-            raise Blacklisted('You have been blacklisted by my owner.', row['reason'])
+        # Until the blacklist was loaded we can't know who is blacklisted, so nobody but the owner gets through.
+        # The owner can't be blacklisted anyway and might need to fix things with reloadblacklist.
+        if not self._ready.is_set() and not await ctx.bot.is_owner(ctx.author):
+            try:
+                await asyncio.wait_for(self._ready.wait(), LOAD_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise commands.CheckFailure('The blacklist couldn\'t be loaded yet. Try again later.')
+
+        if ctx.author.id in self._blacklist:
+            raise Blacklisted('You have been blacklisted by my owner.', self._blacklist[ctx.author.id])
 
         if not ctx.guild:
             return True
 
-        row = await self.get_blacklist(ctx.guild.id, con=ctx.db)
-        if row:
-            raise Blacklisted('This server has been blacklisted by my owner.', row['reason'])
+        if ctx.guild.id in self._blacklist:
+            raise Blacklisted('This server has been blacklisted by my owner.', self._blacklist[ctx.guild.id])
 
         return True
 
@@ -67,9 +93,32 @@ class Blacklists(commands.Cog):
         if isinstance(error, Blacklisted):
             await ctx.send(embed=error.to_embed())
 
-    async def get_blacklist(self, snowflake, *, con):
-        query = 'SELECT reason FROM blacklist WHERE snowflake = $1;'
-        return await con.fetchrow(query, snowflake)
+    async def _load_blacklist(self):
+        delay = 1
+        while True:
+            try:
+                await self.reload_blacklist()
+            except Exception as e:
+                logger.error('Loading the blacklist failed due to %r, retrying in %s seconds', e, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_LOAD_RETRY_DELAY)
+            else:
+                return
+
+    async def reload_blacklist(self, *, connection=None):
+        """Replaces the in-memory blacklist with the current contents of the blacklist table."""
+
+        connection = connection or self.bot.pool
+        query = 'SELECT snowflake, reason FROM blacklist;'
+        async with self._lock:
+            self._blacklist = dict(await connection.fetch(query))
+        self._ready.set()
+
+        return len(self._blacklist)
+
+    def is_blacklisted(self, snowflake):
+        # Treat everyone as blacklisted as long as the blacklist wasn't loaded.
+        return not self._ready.is_set() or snowflake in self._blacklist
 
     async def _blacklist_embed(self, ctx, action, icon, thing, reason, time):
         type_name = 'Server' if isinstance(thing, discord.Guild) else 'User'
@@ -92,12 +141,15 @@ class Blacklists(commands.Cog):
         time = datetime.utcnow()
         query = 'INSERT INTO blacklist VALUES ($1, $2, $3);'
 
-        try:
-            await ctx.db.execute(query, server_or_user.id, time, reason)
-        except asyncpg.UniqueViolationError:
-            return await ctx.send(f'{server_or_user} has already been blacklisted.')
-        else:
-            await self._blacklist_embed(ctx, 'blacklisted', _blocked_icon, server_or_user, reason, time)
+        async with self._lock:
+            try:
+                await ctx.db.execute(query, server_or_user.id, time, reason)
+            except asyncpg.UniqueViolationError:
+                return await ctx.send(f'{server_or_user} has already been blacklisted.')
+            else:
+                self._blacklist[server_or_user.id] = reason
+
+        await self._blacklist_embed(ctx, 'blacklisted', _blocked_icon, server_or_user, reason, time)
 
     @commands.command(name='unblacklist', aliases=['ubl', 'unblock'])
     async def _unblacklist(self, ctx, server_or_user: _GuildOrUser, *, reason=''):
@@ -107,13 +159,25 @@ class Blacklists(commands.Cog):
             return await ctx.send(f'You can\'t even block my owner, so you can\'t unblock him. {self.emojis.get("smart")}')
 
         query = 'DELETE FROM blacklist WHERE snowflake = $1;'
-        result = await ctx.db.execute(query, server_or_user.id)
+        async with self._lock:
+            result = await ctx.db.execute(query, server_or_user.id)
+            self._blacklist.pop(server_or_user.id, None)
 
         if result[-1] == '0':
             return await ctx.send(f'{server_or_user} isn\'t blacklisted.')
 
         await self._blacklist_embed(ctx, 'unblacklisted', _unblocked_icon, server_or_user, reason, datetime.utcnow())
 
+    @commands.command(name='reloadblacklist', aliases=['rbl'])
+    async def _reload_blacklist(self, ctx):
+        """Reloads the blacklist from the database.
+
+        Only needed if the blacklist table was modified by hand.
+        """
+
+        count = await self.reload_blacklist(connection=ctx.db)
+        await ctx.send(f'Reloaded the blacklist. {pluralize(entry=count)} loaded.')
+
 
 def setup(bot):
     bot.add_cog(Blacklists(bot))
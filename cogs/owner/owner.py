@@ -13,11 +13,11 @@ from functools import partial
 import discord
 from discord.ext import commands
 
-from utils import disambiguate
+from utils import cache, disambiguate
 from utils.colors import random_color
 from utils.db import TableFormat
 from utils.examples import wrap_example
-from utils.formats import pluralize
+from utils.formats import finder, pluralize
 from utils.subprocesses import run_subprocess
 
 logger = logging.getLogger(__name__)
@@ -242,6 +242,80 @@ class Owner(commands.Cog):
         await ctx.message.add_reaction(self.emojis.get('failure'))
         await ctx.send(f'Yo, mate. My nigga ({ctx.bot.creator.name}) didn\'t code me properly. Blame him for {error}.')
 
+    @staticmethod
+    def _get_cache(name):
+        caches = cache.all_caches()
+        if name in caches:
+            return name, caches[name]
+
+        found = finder(name, caches, count=1)
+        if not found:
+            raise commands.BadArgument(f'There is no cache called {name}.')
+
+        return found[0]
+
+    @commands.group(name='cache', aliases=['caches'], invoke_without_command=True)
+    async def _cache(self, ctx):
+        """Shows all caches with their stats."""
+
+        table = TableFormat()
+        table.set(['Name', 'Entries', 'Size', 'Hits', 'Misses', 'Coalesced', 'Memory'])
+
+        for name, wrapper in cache.all_caches().items():
+            stats = wrapper.get_stats()
+            size = wrapper.get_size()
+            table.add_row([
+                name.rpartition('cogs.')[2],
+                len(wrapper.cache),
+                '\N{INFINITY}' if size is None else size,
+                stats.hits,
+                stats.misses,
+                stats.coalesced,
+                f'{wrapper.get_memory() / 1024:.1f} KiB',
+            ])
+
+        fmt = f'```\n{table.render()}\n```'
+
+        # Things that aren't cached with utils.cache but save work as well.
+        aliases = self.bot.get_cog('Aliases')
+        if aliases:
+            fmt += f'\nAlias lookups answered without a query: {aliases.queries_avoided}'
+
+        if len(fmt) > 2000:
+            url = await ctx.hastebin(fmt.encode('utf-8'))
+            await ctx.send(f'Too many caches...\n<{url}>')
+        else:
+            await ctx.send(fmt)
+
+    @_cache.command(name='clear')
+    async def _cache_clear(self, ctx, *, name=None):
+        """Clears a cache.
+
+        If no name is given, all caches are cleared.
+        """
+
+        if name is None:
+            caches = cache.all_caches()
+        else:
+            caches = dict([self._get_cache(name)])
+
+        for wrapper in caches.values():
+            wrapper.clear()
+
+        await ctx.send(f'Cleared {pluralize(cache=len(caches))}.')
+
+    @_cache.command(name='resize')
+    async def _cache_resize(self, ctx, name, size: int):
+        """Changes the maximum number of entries of a cache."""
+
+        name, wrapper = self._get_cache(name)
+        try:
+            wrapper.resize(size)
+        except ValueError as e:
+            return await ctx.send(e)
+
+        await ctx.send(f'{name} now holds up to {pluralize(entry=size)}.')
+
     @commands.command(name='shutdown', aliases=['die', 'fuckoff'])
     async def _shutdown(self, ctx):
         """Shuts down the bot."""
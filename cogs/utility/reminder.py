@@ -1,5 +1,3 @@
-import json
-
 import discord
 from discord.ext import commands
 
@@ -58,7 +56,7 @@ class Reminder(commands.Cog):
         """
 
         query = """
-            SELECT   id, expires, args_kwargs
+            SELECT   id, expires, args_kwargs #>> '{args,1}' AS channel_id, args_kwargs #>> '{args,2}' AS message
             FROM     scheduler
             WHERE    event = 'reminder_complete'
             AND      args_kwargs #>> '{args,0}' = $1
@@ -73,9 +71,8 @@ class Reminder(commands.Cog):
 
         await ctx.bot.db_scheduler.remove(discord.Object(id=entry['id']))
 
-        args_kwargs = json.loads(entry['args_kwargs'])
-        _, channel_id, message = args_kwargs['args']
-        channel = self.bot.get_channel(channel_id) or 'deleted-channel'
+        channel_id, message = entry['channel_id'], entry['message']
+        channel = channel_id and self.bot.get_channel(int(channel_id)) or 'deleted-channel'
         server = getattr(channel, 'guild', None)
 
         embed = (discord.Embed(colour=0xFF0000, description=message, timestamp=entry['expires'])
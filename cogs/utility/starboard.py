@@ -1,11 +1,13 @@
+import array
 import asyncio
 import collections
+import contextlib
 import datetime
 import logging
+import random
 import re
 import time
 import typing
-import weakref
 
 import asyncpg
 import discord
@@ -19,6 +21,40 @@ from utils.paginator import Paginator
 
 logger = logging.getLogger(__name__)
 
+# Stars that come in within this many seconds are combined into a single edit of the starboard message.
+EDIT_DELAY = 2
+
+# Clean-ups work through the entries in batches of this size, which is also the limit for bulk deleting messages.
+CLEANUP_BATCH_SIZE = 100
+# The number of concurrent requests for messages that have to be handled one by one.
+CLEANUP_WORKERS = 4
+# Seconds to wait for the delete events of messages that were deleted by a clean-up.
+DELETE_EVENT_GRACE_PERIOD = 60
+
+# How often the leaderboard stats of guilds that got new stars are recomputed, in seconds.
+STATS_REFRESH_INTERVAL = 5 * 60
+
+# The number of stars of a single guild that may wait to be processed. Reactions beyond that are dropped.
+STAR_QUEUE_SIZE = 100
+
+# How many random messages `star random` tries before giving up, in case it picks ones that were deleted.
+RANDOM_ATTEMPTS = 3
+
+
+def _min_bulk_delete_snowflake():
+    # Discord doesn't bulk delete messages that are older than 14 days.
+    return discord.utils.time_snowflake(datetime.datetime.utcnow() - datetime.timedelta(days=14))
+
+
+async def _run_workers(jobs, worker, *, workers=CLEANUP_WORKERS):
+    jobs = iter(jobs)
+
+    async def run():
+        for job in jobs:
+            await worker(job)
+
+    await asyncio.gather(*(run() for _ in range(workers)))
+
 
 class StarBoardError(Exception):
     pass
@@ -67,9 +103,11 @@ class StarboardEntry(db.Table, table_name='starboard_entries'):
     channel_id = db.Column(db.BigInt)
     author_id = db.Column(db.BigInt)
     guild_id = db.ForeignKey(Starboard.id, type=db.BigInt)
+    stars = db.Column(db.Integer, default=0)  # Kept in sync with starrers so we don't have to count them on every star.
 
     # There is some fuckery with ForeignKeys that I don't want to fix rn. They must be referenced as strings.
     starboard_entries_index = db.Index(bot_message_id, message_id, 'guild_id')
+    starboard_entries_stars_index = db.Index('guild_id', stars)
 
 
 class Starrers(db.Table):
@@ -80,6 +118,32 @@ class Starrers(db.Table):
     starrers_index = db.Index(author_id, 'entry_id', unique=True)
 
 
+# The leaderboards of the stats commands. They're recomputed by StarBoard.refresh_stats.
+class StarboardStats(db.Table, table_name='starboard_stats'):
+    guild_id = db.ForeignKey(Starboard.id, type=db.BigInt)
+    messages = db.Column(db.Integer, default=0)
+    stars = db.Column(db.Integer, default=0)
+    # Set by everything that changes the entries of a guild, so the stats of it have to be recomputed.
+    dirty = db.Column(db.Boolean, default=False)
+    # Bumped along with dirty, so a refresh can tell whether something changed while it was running.
+    version = db.Column(db.Integer, default=0)
+    updated_at = db.Column(db.Timestamp, nullable=True)
+
+    starboard_stats_index = db.Index('guild_id', unique=True)
+
+
+class StarboardMemberStats(db.Table, table_name='starboard_member_stats'):
+    guild_id = db.ForeignKey(Starboard.id, type=db.BigInt)
+    member_id = db.Column(db.BigInt)
+    messages = db.Column(db.Integer, default=0)
+    received = db.Column(db.Integer, default=0)
+    given = db.Column(db.Integer, default=0)
+
+    starboard_member_stats_index = db.Index('guild_id', member_id, unique=True)
+    starboard_member_stats_received_index = db.Index('guild_id', received)
+    starboard_member_stats_given_index = db.Index('guild_id', given)
+
+
 class StarBoardConfig:
     __slots__ = ('bot', 'id', 'channel_id', 'threshold', 'locked', 'needs_migration', 'max_age')
 
@@ -109,30 +173,40 @@ class StarBoard(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-        # To save Discord some HTTP requests
-        self._message_cache = {}
-        self._cleaner = self.bot.loop.create_task(self.clean_message_cache())
-
         self._about_to_be_deleted = set()
-        self._locks = weakref.WeakValueDictionary()
+
+        # guild_id -> (asyncio.Queue, worker task). Stars of a guild are processed one after another by its worker,
+        # which holds at most one connection, so a star storm in one guild can't take the pool from everyone else.
+        self._star_queues = {}
+
+        # bot_message_id -> (bot_message, message, stars) of the edits that are waiting for EDIT_DELAY to pass.
+        self._pending_edits = {}
+        # bot_message_id -> the task that applies the pending edit.
+        self._edit_tasks = {}
+        self._edit_stats = collections.Counter()
+
+        self._stats_refresher = self.bot.loop.create_task(self._refresh_stats_periodically())
+
+        self.bot.invalidation.subscribe('starboard', self.get_starboard.invalidate)
+        self.bot.invalidation.subscribe('starboard', self._get_random_candidates.invalidate)
 
     def cog_unload(self):
-        self._cleaner.cancel()
+        self._stats_refresher.cancel()
+        for _, worker in self._star_queues.values():
+            worker.cancel()
+
+        for task in self._edit_tasks.values():
+            task.cancel()
+
+        self.bot.invalidation.unsubscribe('starboard', self.get_starboard.invalidate)
+        self.bot.invalidation.unsubscribe('starboard', self._get_random_candidates.invalidate)
 
     async def cog_command_error(self, ctx, error):
         if isinstance(error, StarBoardError):
             await ctx.send(error)
 
-    async def clean_message_cache(self):
-        try:
-            while not self.bot.is_closed():
-                self._message_cache.clear()
-                await asyncio.sleep(3600)
-
-        except asyncio.CancelledError:
-            pass
-
-    @cache.cache(max_size=None)
+    # Keyed by the guild ID only, the connection that was used doesn't matter.
+    @cache.cache(max_size=None, make_key=lambda a, kw: a[-1], max_memory=2 ** 20)
     async def get_starboard(self, guild_id, *, connection=None):
         connection = connection or self.bot.pool
 
@@ -190,22 +264,226 @@ class StarBoard(commands.Cog):
 
         return content, embed
 
+    # To save Discord some HTTP requests. Messages that couldn't be found raise, so they aren't cached.
+    @cache.cache(max_size=2048, make_key=lambda a, kw: a[-1], ttl=60 * 60)
+    async def _fetch_message(self, channel, message_id):
+        fake = discord.Object(message_id + 1)
+        msg = await channel.history(limit=1, before=fake).next()
+
+        if msg.id != message_id:
+            raise StarBoardError('Message not found.')
+
+        return msg
+
     async def get_message(self, channel, message_id):
         try:
-            return self._message_cache[message_id]
-        except KeyError:
+            return await self._fetch_message(channel, message_id)
+        except Exception:  # muh pycodestyle
+            return None
+
+    # 8 bytes per entry, so even huge starboards are fine.
+    @cache.cache(max_size=256, make_key=lambda a, kw: a[-1], ttl=60 * 60, max_memory=2 ** 23)
+    async def _get_random_candidates(self, guild_id, *, connection=None):
+        """Returns an array of the IDs of all messages in the starboard of a guild.
+
+        New messages are appended as they're posted. Deleted ones are only removed once they're picked.
+        """
+
+        connection = connection or self.bot.pool
+
+        query = 'SELECT ARRAY(SELECT bot_message_id FROM starboard_entries WHERE guild_id = $1 AND bot_message_id IS NOT NULL);'
+        return array.array('q', await connection.fetchval(query, guild_id))
+
+    def _add_random_candidate(self, guild_id, bot_message_id):
+        candidates = self._get_random_candidates.cache.get(guild_id)
+        if candidates is not None:
+            candidates.append(bot_message_id)
+
+    @property
+    def message_cache_stats(self):
+        """Returns the hit rate of the message cache and the number of HTTP requests it saved."""
+
+        stats = self._fetch_message.get_stats()
+        saved = stats.hits + stats.coalesced
+        lookups = saved + stats.misses
+        return (saved / lookups if lookups else 0), saved
+
+    async def _refresh_stats_periodically(self):
+        # The dirty marks are stored with the stats, so this also catches up on what was missed before a restart.
+        await self.bot.wait_until_ready()
+
+        while True:
             try:
-                fake = discord.Object(message_id + 1)
-                msg = await channel.history(limit=1, before=fake).next()
+                guild_ids = [record[0] for record in await self.bot.pool.fetch('SELECT guild_id FROM starboard_stats WHERE dirty;')]
+            except Exception as e:
+                logger.error('Fetching the guilds with outdated starboard stats failed due to %r', e)
+                guild_ids = []
 
-                if msg.id != message_id:
-                    return None
+            for guild_id in guild_ids:
+                try:
+                    async with self.bot.pool.acquire() as con:
+                        await self.refresh_stats(guild_id, connection=con)
+                except Exception as e:
+                    logger.error('Refreshing the starboard stats of guild %s failed due to %r', guild_id, e)
 
-                self._message_cache[message_id] = msg
-                return msg
+            await asyncio.sleep(STATS_REFRESH_INTERVAL)
 
-            except Exception:  # muh pycodestyle
-                return None
+    async def refresh_stats(self, guild_id, *, connection):
+        """Recomputes the leaderboard stats of a guild."""
+
+        # The row isn't locked while everything is counted, that would block every star of the guild.
+        # Instead, dirty is only cleared at the end if nothing was marked in the meantime.
+        query = """
+            INSERT INTO starboard_stats (guild_id)
+            VALUES      ($1)
+            ON CONFLICT (guild_id)
+            DO NOTHING;
+        """
+        await connection.execute(query, guild_id)
+
+        query = 'SELECT version FROM starboard_stats WHERE guild_id = $1;'
+        version = await connection.fetchval(query, guild_id)
+
+        query = 'SELECT COUNT(*), COALESCE(SUM(stars), 0) FROM starboard_entries WHERE guild_id = $1;'
+        messages, stars = await connection.fetchrow(query, guild_id)
+
+        async with connection.transaction():
+            await connection.execute('DELETE FROM starboard_member_stats WHERE guild_id = $1;', guild_id)
+
+            query = """
+                INSERT INTO starboard_member_stats (guild_id, member_id, messages, received, given)
+                SELECT      $1, t.member_id, SUM(t.messages), SUM(t.received), SUM(t.given)
+                FROM (
+                    SELECT author_id AS member_id, 1 AS messages, stars AS received, 0 AS given
+                    FROM   starboard_entries
+                    WHERE  guild_id = $1
+                    AND    author_id IS NOT NULL
+                    UNION ALL
+                    SELECT     starrers.author_id, 0, 0, 1
+                    FROM       starrers
+                    INNER JOIN starboard_entries entry
+                    ON         entry.id = starrers.entry_id
+                    WHERE      entry.guild_id = $1
+                ) AS t
+                GROUP BY    t.member_id;
+            """
+            await connection.execute(query, guild_id)
+
+            query = """
+                UPDATE starboard_stats
+                SET    messages = $2, stars = $3, updated_at = NOW() AT TIME ZONE 'UTC', dirty = version <> $4
+                WHERE  guild_id = $1;
+            """
+            await connection.execute(query, guild_id, messages, stars, version)
+
+    @property
+    def edits_saved(self):
+        """The number of starboard message edits that were merged into a later one."""
+
+        return self._edit_stats['coalesced']
+
+    def queue_edit(self, bot_message, message, stars):
+        """Edits a starboard message after EDIT_DELAY seconds, with the number of stars it has by then.
+
+        This doesn't run in the worker of the guild, so the HTTP request doesn't hold up other stars.
+        """
+
+        if bot_message.id in self._pending_edits:
+            self._edit_stats['coalesced'] += 1
+        else:
+            self._edit_tasks[bot_message.id] = self.bot.loop.create_task(self._apply_edit(bot_message.id))
+
+        self._pending_edits[bot_message.id] = (bot_message, message, stars)
+
+    def cancel_edit(self, bot_message_id):
+        self._pending_edits.pop(bot_message_id, None)
+        task = self._edit_tasks.pop(bot_message_id, None)
+        if task is not None:
+            task.cancel()
+
+    async def _apply_edit(self, bot_message_id):
+        await asyncio.sleep(EDIT_DELAY)
+
+        # From here on, a new star queues a new edit.
+        del self._edit_tasks[bot_message_id]
+        bot_message, message, stars = self._pending_edits.pop(bot_message_id)
+
+        content, embed = self.get_emoji_message(message, stars)
+        try:
+            await bot_message.edit(content=content, embed=embed)
+        except discord.HTTPException as e:
+            logger.warning('Editing starboard message %s failed due to %r', bot_message_id, e)
+
+    def submit_star(self, fmt, channel, message_id, starrer_id):
+        """Queues a star or unstar for the worker of the guild and returns a future for its result.
+
+        Raises asyncio.QueueFull if too many stars of the guild are still waiting.
+        """
+
+        guild_id = channel.guild.id
+        try:
+            queue, _ = self._star_queues[guild_id]
+        except KeyError:
+            queue = asyncio.Queue(STAR_QUEUE_SIZE, loop=self.bot.loop)
+            worker = self.bot.loop.create_task(self._star_worker(guild_id, queue))
+            self._star_queues[guild_id] = queue, worker
+
+        future = self.bot.loop.create_future()
+        queue.put_nowait((getattr(self, f'{fmt}_message'), channel, message_id, starrer_id, future))
+        return future
+
+    async def _star_worker(self, guild_id, queue):
+        # The worker keeps its connection until the queue ran dry and then shuts down.
+        # The next star of the guild simply starts a new one.
+        try:
+            async with self.bot.pool.acquire() as con:
+                while True:
+                    try:
+                        job = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        # Releasing the connection takes a round trip, stars that come in meanwhile must go to a new worker.
+                        del self._star_queues[guild_id]
+                        break
+
+                    await self._run_star_job(job, con)
+        except BaseException:
+            # We were cancelled or couldn't get a connection, so nobody is going to process the rest.
+            if self._star_queues.get(guild_id, (None,))[0] is queue:
+                del self._star_queues[guild_id]
+
+            while not queue.empty():
+                *_, future = queue.get_nowait()
+                future.cancel()
+
+            raise
+
+    @staticmethod
+    async def _run_star_job(job, connection):
+        method, channel, message_id, starrer_id, future = job
+        if future.cancelled():
+            return
+
+        try:
+            result = await method(channel, message_id, starrer_id, connection=connection)
+        except asyncio.CancelledError:
+            # Before 3.8 this is an Exception, but it must stop the worker.
+            raise
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+        finally:
+            # The worker was cancelled while it was processing this one.
+            if not future.done():
+                future.cancel()
+
+    def _is_starrable(self, guild_id):
+        # Only the cached config is checked to avoid a query for every reaction.
+        # If it isn't cached, the worker fetches it anyway.
+        starboard = self.get_starboard.cache.get(guild_id)
+        return starboard is None or (starboard.channel is not None and not starboard.locked)
 
     async def reaction_action(self, fmt, payload):
         if str(payload.emoji) != '\N{WHITE MEDIUM STAR}':
@@ -215,23 +493,34 @@ class StarBoard(commands.Cog):
         if not isinstance(channel, discord.TextChannel):
             return
 
-        method = getattr(self, f'{fmt}_message')
+        if not self._is_starrable(channel.guild.id):
+            return
+
+        blacklist = self.bot.get_cog('Blacklists')
+        if blacklist and blacklist.is_blacklisted(channel.guild.id):
+            return
 
         user = self.bot.get_user(payload.user_id)
         if not user or user.bot:
             return
 
-        async with self.bot.pool.acquire() as con:
-            query = 'SELECT snowflake FROM blacklist WHERE snowflake = $1;'
-            result = await con.fetchrow(query, channel.guild.id)
-            if result:
-                return
+        try:
+            future = self.submit_star(fmt, channel, payload.message_id, payload.user_id)
+        except asyncio.QueueFull:
+            logger.warning('Dropped a %s in guild %s because too many are waiting to be processed', fmt, channel.guild.id)
+            return
 
-            try:
-                await method(channel, payload.message_id, payload.user_id, connection=con)
-            except StarBoardError:
-                pass
+        try:
+            await future
+        except StarBoardError:
+            pass
+        except asyncio.CancelledError:
+            # The cog was unloaded.
+            pass
+        except Exception as e:
+            logger.error('Processing a %s in guild %s failed due to %r', fmt, channel.guild.id, e)
 
+    @commands.Cog.listener()
     async def on_guild_channel_delete(self, channel):
         if not isinstance(channel, discord.TextChannel):
             return
@@ -244,6 +533,8 @@ class StarBoard(commands.Cog):
             query = 'DELETE FROM starboard WHERE id = $1;'
             await con.execute(query, channel.guild.id)
 
+        self.bot.invalidation.publish('starboard', channel.guild.id)
+
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload):
         await self.reaction_action('star', payload)
@@ -254,6 +545,9 @@ class StarBoard(commands.Cog):
 
     @commands.Cog.listener()
     async def on_raw_message_delete(self, payload):
+        self._fetch_message.invalidate(payload.message_id)
+        self.cancel_edit(payload.message_id)
+
         if payload.message_id in self._about_to_be_deleted:
             self._about_to_be_deleted.discard(payload.message_id)
             return
@@ -262,12 +556,26 @@ class StarBoard(commands.Cog):
         if not starboard.channel or starboard.channel.id != payload.channel_id:
             return
 
-        async with self.bot.pool.acquire() as con:
-            query = 'DELETE FROM starboard_entries WHERE bot_message_id = $1;'
-            await con.execute(query, list(payload.message_id))
+        query = """
+            WITH entry AS (
+                DELETE FROM starboard_entries
+                WHERE       bot_message_id = $1
+                RETURNING   guild_id
+            )
+            INSERT INTO starboard_stats (guild_id, dirty)
+            SELECT      DISTINCT guild_id, TRUE
+            FROM        entry
+            ON CONFLICT (guild_id)
+            DO UPDATE SET dirty = TRUE, version = starboard_stats.version + 1;
+        """
+        await self.bot.pool.execute(query, payload.message_id)
 
     @commands.Cog.listener()
     async def on_raw_bulk_message_delete(self, payload):
+        for message_id in payload.message_ids:
+            self._fetch_message.invalidate(message_id)
+            self.cancel_edit(message_id)
+
         if payload.message_ids <= self._about_to_be_deleted:
             self._about_to_be_deleted.difference_update(payload.message_ids)
             return
@@ -276,9 +584,19 @@ class StarBoard(commands.Cog):
         if not starboard.channel or starboard.channel.id != payload.channel_id:
             return
 
-        async with self.bot.pool.acquire() as con:
-            query = 'DELETE FROM starboard_entries WHERE bot_message_id = ANY($1::BIGINT[]);'
-            await con.execute(query, list(payload.message_ids))
+        query = """
+            WITH entry AS (
+                DELETE FROM starboard_entries
+                WHERE       bot_message_id = ANY($1::BIGINT[])
+                RETURNING   guild_id
+            )
+            INSERT INTO starboard_stats (guild_id, dirty)
+            SELECT      DISTINCT guild_id, TRUE
+            FROM        entry
+            ON CONFLICT (guild_id)
+            DO UPDATE SET dirty = TRUE, version = starboard_stats.version + 1;
+        """
+        await self.bot.pool.execute(query, list(payload.message_ids))
 
     @commands.Cog.listener()
     async def on_raw_reaction_clear(self, payload):
@@ -291,27 +609,32 @@ class StarBoard(commands.Cog):
             if not starboard.channel:
                 return
 
-            query = 'DELETE FROM starboard_entries WHERE message_id = $1 RETURNING bot_message_id;'
+            query = """
+                WITH entry AS (
+                    DELETE FROM starboard_entries
+                    WHERE       message_id = $1
+                    RETURNING   guild_id, bot_message_id
+                ), dirty AS (
+                    INSERT INTO starboard_stats (guild_id, dirty)
+                    SELECT      DISTINCT guild_id, TRUE
+                    FROM        entry
+                    ON CONFLICT (guild_id)
+                    DO UPDATE SET dirty = TRUE, version = starboard_stats.version + 1
+                )
+                SELECT bot_message_id
+                FROM   entry;
+            """
             bot_message_id = await con.fetchrow(query, payload.message_id)
-
             if not bot_message_id:
                 return
 
             bot_message_id = bot_message_id[0]
+            self.cancel_edit(bot_message_id)
             msg = await self.get_message(starboard.channel, bot_message_id)
             if msg:
                 await msg.delete()
 
     async def star_message(self, channel, message_id, starrer_id, *, connection):
-        guild_id = channel.guild.id
-        lock = self._locks.get(guild_id)
-        if not lock:
-            self._locks[guild_id] = lock = asyncio.Lock(loop=self.bot.loop)
-
-        async with lock:
-            await self._star_message(channel, message_id, starrer_id, connection=connection)
-
-    async def _star_message(self, channel, message_id, starrer_id, *, connection):
         """Stars a message."""
 
         guild_id = channel.guild.id
@@ -332,7 +655,7 @@ class StarBoard(commands.Cog):
             if not ch:
                 raise StarBoardError('Couldn\'t find original channel.')
 
-            return await self._star_message(ch, record['message_id'], starrer_id, connection=connection)
+            return await self.star_message(ch, record['message_id'], starrer_id, connection=connection)
 
         msg = await self.get_message(channel, message_id)
         if not msg:
@@ -349,69 +672,51 @@ class StarBoard(commands.Cog):
             raise StarBoardError('\N{NO ENTRY SIGN} This message is too old.')
 
         # Ew shit. Fuckery incoming
+        # If the starrer already exists, the whole statement fails and the star count isn't touched either.
         query = """
-            WITH to_insert AS (
-                INSERT INTO starboard_entries AS entries (message_id, channel_id, guild_id, author_id)
-                VALUES      ($1, $2, $3, $4)
+            WITH entry AS (
+                INSERT INTO starboard_entries AS entries (message_id, channel_id, guild_id, author_id, stars)
+                VALUES      ($1, $2, $3, $4, 1)
                 ON CONFLICT (message_id)
-                DO NOTHING
-                RETURNING   entries.id
+                DO UPDATE SET stars = entries.stars + 1
+                RETURNING   entries.id, entries.stars, entries.bot_message_id
+            ), starrer AS (
+                INSERT INTO starrers (author_id, entry_id)
+                SELECT      $5, id
+                FROM        entry
+            ), dirty AS (
+                INSERT INTO starboard_stats (guild_id, dirty)
+                VALUES      ($3, TRUE)
+                ON CONFLICT (guild_id)
+                DO UPDATE SET dirty = TRUE, version = starboard_stats.version + 1
             )
-            INSERT INTO starrers (author_id, entry_id)
-            SELECT      $5, entry.id
-            FROM (
-                SELECT    id
-                FROM      to_insert
-                UNION ALL
-                SELECT    id
-                FROM      starboard_entries
-                WHERE     message_id = $1
-                LIMIT     1
-            ) AS entry
-            RETURNING entry_id;
+            SELECT id, stars, bot_message_id
+            FROM   entry;
         """
         try:
             record = await connection.fetchrow(query, message_id, channel.id, guild_id, msg.author.id, starrer_id)
         except asyncpg.UniqueViolationError:
             raise StarBoardError('\N{NO ENTRY SIGN} You already starred this message.')
 
-        entry_id = record[0]
-
-        query = 'SELECT COUNT(*) FROM starrers WHERE entry_id = $1;'
-        record = await connection.fetchrow(query, entry_id)
-
-        count = record[0]
+        _, count, bot_message_id = record
         if count < starboard.threshold:
             return
 
-        content, embed = self.get_emoji_message(msg, count)
-
-        query = 'SELECT bot_message_id FROM starboard_entries WHERE message_id = $1;'
-        record = await connection.fetchrow(query, message_id)
-        bot_message_id = record[0]
-
         if not bot_message_id:
+            content, embed = self.get_emoji_message(msg, count)
             new_msg = await starboard.channel.send(content, embed=embed)
             query = 'UPDATE starboard_entries SET bot_message_id = $1 WHERE message_id = $2;'
             await connection.execute(query, new_msg.id, message_id)
+            self._add_random_candidate(guild_id, new_msg.id)
         else:
             new_msg = await self.get_message(starboard.channel, bot_message_id)
             if not new_msg:
                 query = 'DELETE FROM starboard_entries WHERE message_id = $1;'
                 await connection.execute(query, message_id)
             else:
-                await new_msg.edit(content=content, embed=embed)
+                self.queue_edit(new_msg, msg, count)
 
     async def unstar_message(self, channel, message_id, starrer_id, *, connection):
-        guild_id = channel.guild.id
-        lock = self._locks.get(guild_id)
-        if not lock:
-            self._locks[guild_id] = lock = asyncio.Lock(loop=self.bot.loop)
-
-        async with lock:
-            await self._unstar_message(channel, message_id, starrer_id, connection=connection)
-
-    async def _unstar_message(self, channel, message_id, starrer_id, *, connection):
         """Unstars a message."""
 
         guild_id = channel.guild.id
@@ -432,26 +737,34 @@ class StarBoard(commands.Cog):
             if not ch:
                 raise StarBoardError('Couldn\'t find original message.')
 
-            return await self._unstar_message(ch, record['message_id'], starrer_id, connection=connection)
+            return await self.unstar_message(ch, record['message_id'], starrer_id, connection=connection)
 
         query = """
-            DELETE FROM starrers
-            USING       starboard_entries entry
-            WHERE       entry.message_id = $1
-            AND         entry.id = starrers.entry_id
-            AND         starrers.author_id = $2
-            RETURNING   starrers.entry_id, entry.bot_message_id;
+            WITH starrer AS (
+                DELETE FROM starrers
+                USING       starboard_entries entry
+                WHERE       entry.message_id = $1
+                AND         entry.id = starrers.entry_id
+                AND         starrers.author_id = $2
+                RETURNING   starrers.entry_id
+            ), dirty AS (
+                INSERT INTO starboard_stats (guild_id, dirty)
+                SELECT      $3::BIGINT, TRUE
+                FROM        starrer
+                ON CONFLICT (guild_id)
+                DO UPDATE SET dirty = TRUE, version = starboard_stats.version + 1
+            )
+            UPDATE    starboard_entries AS entries
+            SET       stars = entries.stars - 1
+            FROM      starrer
+            WHERE     entries.id = starrer.entry_id
+            RETURNING entries.id, entries.stars, entries.bot_message_id;
         """
-        record = await connection.fetchrow(query, message_id, starrer_id)
+        record = await connection.fetchrow(query, message_id, starrer_id, guild_id)
         if not record:
             raise StarBoardError('\N{NO ENTRY SIGN} You haven\'t starred this message.')
 
-        entry_id = record[0]
-        bot_message_id = record[1]
-
-        query = 'SELECT COUNT(*) FROM starrers WHERE entry_id = $1;'
-        count = await connection.fetchrow(query, entry_id)
-        count = count[0]
+        entry_id, count, bot_message_id = record
 
         if count == 0:
             query = 'DELETE FROM starboard_entries WHERE id = $1;'
@@ -465,6 +778,7 @@ class StarBoard(commands.Cog):
             return
 
         if count < starboard.threshold:
+            self.cancel_edit(bot_message_id)
             self._about_to_be_deleted.add(bot_message_id)
             if count:
                 query = 'UPDATE starboard_entries SET bot_message_id = NULL WHERE id = $1;'
@@ -476,8 +790,39 @@ class StarBoard(commands.Cog):
             if not msg:
                 raise StarBoardError('\N{BLACK QUESTION MARK ORNAMENT} This message couldn\'t be found.')
 
-            content, embed = self.get_emoji_message(msg, count)
-            await bot_message.edit(content=content, embed=embed)
+            self.queue_edit(bot_message, msg, count)
+
+    async def delete_starboard_messages(self, channel, message_ids):
+        """Deletes messages in the starboard channel with as few requests as possible.
+
+        Messages younger than 14 days are bulk deleted, older ones are deleted one by one by a few workers.
+        Messages that are already gone are ignored.
+        """
+
+        self._about_to_be_deleted.update(message_ids)
+        for message_id in message_ids:
+            self.cancel_edit(message_id)
+
+        min_snowflake = _min_bulk_delete_snowflake()
+        recent = [discord.Object(id) for id in message_ids if id > min_snowflake]
+        old = [id for id in message_ids if id <= min_snowflake]
+
+        try:
+            for i in range(0, len(recent), CLEANUP_BATCH_SIZE):
+                # A batch of a single message is deleted like any other message, which raises if it's gone already.
+                with contextlib.suppress(discord.NotFound):
+                    await channel.delete_messages(recent[i:i + CLEANUP_BATCH_SIZE])
+
+            async def delete(message_id):
+                # The HTTP client of discord.py takes care of the rate limits.
+                with contextlib.suppress(discord.NotFound):
+                    await self.bot.http.delete_message(channel.id, message_id)
+
+            await _run_workers(old, delete)
+        finally:
+            # Messages that were gone already never get a delete event that removes them again.
+            # The others usually got theirs by now, this only gives late ones some time.
+            self.bot.loop.call_later(DELETE_EVENT_GRACE_PERIOD, self._about_to_be_deleted.difference_update, message_ids)
 
     @commands.command(name='starboard')
     @commands.guild_only()
@@ -496,7 +841,7 @@ class StarBoard(commands.Cog):
         Or just use `{prefix}starboard`. This will create a channel called starboard.
         """
 
-        self.get_starboard.invalidate(self, ctx.guild.id)
+        self.bot.invalidation.publish('starboard', ctx.guild.id)
 
         starboard = await self.get_starboard(ctx.guild.id, connection=ctx.db)
         if starboard.channel:
@@ -542,9 +887,17 @@ class StarBoard(commands.Cog):
             await name_or_channel.delete(reason='Failure on creating the starboard.')
             await ctx.send(f'Could not create starboard due to an internal error. DM {self.bot.creator} for more information.')
         else:
-            self.get_starboard.invalidate(self, ctx.guild.id)
+            self.bot.invalidation.publish('starboard', ctx.guild.id)
             await ctx.send(f'\N{GLOWING STAR} Starboard created at {name_or_channel.mention}.')
 
+    async def _submit_command(self, ctx, fmt, message_id):
+        try:
+            future = self.submit_star(fmt, ctx.channel, message_id, ctx.author.id)
+        except asyncio.QueueFull:
+            raise StarBoardError('\N{HOURGLASS} Too many stars are being processed right now. Try again later.')
+
+        await future
+
     @commands.group(name='star', invoke_without_command=True, ignore_extra=False)
     @commands.guild_only()
     async def _star(self, ctx, message: MessageID):
@@ -558,7 +911,7 @@ class StarBoard(commands.Cog):
         You can only star a message once.
         """
 
-        await self.star_message(ctx.channel, message, ctx.author.id, connection=ctx.db)
+        await self._submit_command(ctx, 'star', message)
         await ctx.message.delete()
 
     @commands.command(name='unstar')
@@ -570,7 +923,7 @@ class StarBoard(commands.Cog):
         You must have Developer Mode enabled to get that functionality.
         """
 
-        await self.unstar_message(ctx.channel, message, ctx.author.id, connection=ctx.db)
+        await self._submit_command(ctx, 'unstar', message)
         await ctx.message.delete()
 
     @_star.command(name='clean')
@@ -582,44 +935,59 @@ class StarBoard(commands.Cog):
         This removes messages in the starboard that only have less than or equal to the number of specified stars.
         This defaults to 1.
 
-        *This only checks the last 100 messages in the starboard.*
-
         **This command requires the Manage Server permission.**
         """
 
         stars = max(stars, 1)
         channel = ctx.starboard.channel
 
-        last_messages = await channel.history(limit=100).map(lambda m: m.id).flatten()
+        # This can take a while for big starboards, so every batch only borrows a connection for its queries.
+        await ctx.release()
 
-        query = """
-            WITH bad_entries AS (
-                SELECT     entry_id
-                FROM       starrers
-                INNER JOIN starboard_entries
-                ON         starboard_entries.id = starrers.entry_id
-                WHERE      starboard_entries.guild_id = $1
-                AND        starboard_entries.bot_message_id = ANY($2::BIGINT[])
-                GROUP BY   entry_id
-                HAVING     COUNT(*) <= $3
+        select = """
+            SELECT   id, bot_message_id
+            FROM     starboard_entries
+            WHERE    guild_id = $1
+            AND      stars <= $2
+            AND      bot_message_id IS NOT NULL
+            AND      id > $3
+            ORDER BY id
+            LIMIT    $4;
+        """
+        delete = """
+            WITH entry AS (
+                DELETE FROM starboard_entries
+                WHERE       bot_message_id = ANY($1::BIGINT[])
+                RETURNING   guild_id
             )
-            DELETE FROM starboard_entries USING bad_entries
-            WHERE       starboard_entries.id = bad_entries.entry_id
-            RETURNING   starboard_entries.bot_message_id;
+            INSERT INTO starboard_stats (guild_id, dirty)
+            SELECT      DISTINCT guild_id, TRUE
+            FROM        entry
+            ON CONFLICT (guild_id)
+            DO UPDATE SET dirty = TRUE, version = starboard_stats.version + 1;
         """
 
-        to_delete = await ctx.db.fetch(query, ctx.guild.id, last_messages, stars)
+        progress = await ctx.send('\N{PUT LITTER IN ITS PLACE SYMBOL} Cleaning up the starboard...')
+        deleted = last_id = 0
+        while True:
+            records = await self.bot.pool.fetch(select, ctx.guild.id, stars, last_id, CLEANUP_BATCH_SIZE)
+            if not records:
+                break
 
-        min_snowflake = int((time.time() - 14 * 24 * 60 * 60) * 1000.0 - 1420070400000) << 22
-        to_delete = [discord.Object(r[0]) for r in to_delete if r[0] > min_snowflake]
+            last_id = records[-1]['id']
+            message_ids = [record['bot_message_id'] for record in records]
 
-        try:
-            self._about_to_be_deleted.update(o.id for o in to_delete)
-            await channel.delete_messages(to_delete)
-        except discord.HTTPException:
-            await ctx.send('Could not delete the messages.')
-        else:
-            await ctx.send(f'\N{PUT LITTER IN ITS PLACE SYMBOL} Deleted {pluralize(**{"message": len(to_delete)})}.')
+            try:
+                await self.delete_starboard_messages(channel, message_ids)
+            except discord.HTTPException:
+                return await progress.edit(content=f'Could not delete the messages. Deleted {pluralize(message=deleted)} before that.')
+
+            await self.bot.pool.execute(delete, message_ids)
+            deleted += len(message_ids)
+            await progress.edit(content=f'\N{PUT LITTER IN ITS PLACE SYMBOL} Deleted {pluralize(message=deleted)} so far...')
+
+        self._get_random_candidates.invalidate(ctx.guild.id)
+        await progress.edit(content=f'\N{PUT LITTER IN ITS PLACE SYMBOL} Deleted {pluralize(message=deleted)}.')
 
     @_star.command(name='show')
     @requires_starboard()
@@ -799,7 +1167,11 @@ class StarBoard(commands.Cog):
                 await ctx.acquire()
                 query = 'UPDATE starboard SET locked = FALSE WHERE id = $1;'
                 await ctx.db.execute(query, ctx.guild.id)
-                self.get_starboard.invalidate(self, ctx.guild.id)
+                self.bot.invalidation.publish('starboard', ctx.guild.id)
+
+                # Authors were looked up, so all of the member stats might have changed.
+                query = 'INSERT INTO starboard_stats (guild_id, dirty) VALUES ($1, TRUE) ON CONFLICT (guild_id) DO UPDATE SET dirty = TRUE, version = starboard_stats.version + 1;'
+                await ctx.db.execute(query, ctx.guild.id)
 
                 if ctx.bot_has_embed_links():
                     embed = (discord.Embed(title='Starboard Migration', color=discord.Color.gold())
@@ -828,7 +1200,7 @@ class StarBoard(commands.Cog):
 
             me = ctx.guild.me
 
-            data_to_pass = {}
+            jobs = []
             for channel_id, messages in needs_requests.items():
                 channel = ctx.guild.get_channel(channel_id)
                 if not channel:
@@ -842,12 +1214,7 @@ class StarBoard(commands.Cog):
                     bad_data += len(messages)
                     continue
 
-                for message_id in sorted(messages):
-                    msg = await self.get_message(channel, message_id)
-                    if msg:
-                        data_to_pass[message_id] = msg.author.id
-                    else:
-                        bad_data += 1
+                jobs.extend((channel, message_id) for message_id in sorted(messages))
 
             query = """
                 UPDATE starboard_entries
@@ -857,14 +1224,40 @@ class StarBoard(commands.Cog):
                 WHERE  starboard_entries.message_id = t.message_id;
             """
 
-            await ctx.acquire()
-            status = await ctx.db.execute(query, list(data_to_pass.keys()), list(data_to_pass.values()))
-            _, _, second_update = status.partition(' ')
-            updated += int(second_update)
+            progress = await ctx.send(f'Looking up the authors of {pluralize(message=len(jobs))}...')
+            data_to_pass = {}
+            done = 0
+
+            async def flush():
+                nonlocal updated
+
+                batch = dict(data_to_pass)
+                data_to_pass.clear()
+                if batch:
+                    status = await self.bot.pool.execute(query, list(batch.keys()), list(batch.values()))
+                    updated += int(status.partition(' ')[2])
+
+                await progress.edit(content=f'Looked up the authors of {done} out of {pluralize(message=len(jobs))}...')
+
+            async def look_up(job):
+                nonlocal bad_data, done
+
+                channel, message_id = job
+                msg = await self.get_message(channel, message_id)
+                if msg:
+                    data_to_pass[message_id] = msg.author.id
+                else:
+                    bad_data += 1
+
+                done += 1
+                if done % CLEANUP_BATCH_SIZE == 0:
+                    await flush()
+
+            await _run_workers(jobs, look_up)
+            await flush()
             updated = min(updated, len(current_messages))
 
             # Fuck yeah, it's finally over
-            await ctx.release()
             await send_confirmation()
 
     @staticmethod
@@ -876,131 +1269,100 @@ class StarBoard(commands.Cog):
         fmt = fmt or (lambda o: o)
         return '\n'.join(f'{chr(emoji + i)}: {fmt(r["ID"])} ({pluralize(**{"star": r["Stars"]})})' for i, r in enumerate(records))
 
+    async def _ensure_stats(self, ctx):
+        # Stats that were never computed or are outdated for longer than the refresh interval are recomputed right away.
+        query = """
+            SELECT messages, stars, updated_at IS NULL OR (dirty AND updated_at < NOW() AT TIME ZONE 'UTC' - $2::INTEGER * INTERVAL '1 second')
+            FROM   starboard_stats
+            WHERE  guild_id = $1;
+        """
+        record = await ctx.db.fetchrow(query, ctx.guild.id, STATS_REFRESH_INTERVAL)
+        if record is None or record[2]:
+            await self.refresh_stats(ctx.guild.id, connection=ctx.db)
+            record = await ctx.db.fetchrow(query, ctx.guild.id, STATS_REFRESH_INTERVAL)
+
+        return record['messages'], record['stars']
+
     async def star_guild_stats(self, ctx):
         embed = discord.Embed(title='Starboard Server Stats', color=discord.Color.gold())
         embed.timestamp = ctx.starboard.channel.created_at
         embed.set_footer(text='Adding stars since')
 
-        # messages starred
-        query = 'SELECT COUNT(*) FROM starboard_entries WHERE guild_id = $1;'
-
-        record = await ctx.db.fetchrow(query, ctx.guild.id)
-        total_messages = record[0]
-
-        # total stars given
-        query = """
-            SELECT     COUNT(*)
-            FROM       starrers
-            INNER JOIN starboard_entries entry
-            ON         entry.id = starrers.entry_id
-            WHERE      entry.guild_id = $1;
-        """
-
-        record = await ctx.db.fetchrow(query, ctx.guild.id)
-        total_stars = record[0]
-
+        total_messages, total_stars = await self._ensure_stats(ctx)
         embed.description = f'{pluralize(**{"message": total_messages})} starred with a total of {total_stars} stars.'
 
-        # Why am I doing this to myself?
+        # Every part is a read of the top 3 rows of an index.
         query = """
-            WITH t AS (
-                SELECT
-                    entry.author_id AS entry_author_id,
-                    starrers.author_id,
-                    entry.bot_message_id
-                FROM       starrers
-                INNER JOIN starboard_entries entry
-                ON         entry.id = starrers.entry_id
-                WHERE      entry.guild_id = $1
-            )
             (
-                SELECT     t.entry_author_id AS "ID", 1 AS "Type", COUNT(*) AS "Stars"
-                FROM       t
-                WHERE      t.entry_author_id IS NOT NULL
-                GROUP BY   t.entry_author_id
-                ORDER BY   "Stars"
-                DESC LIMIT 3
+                SELECT   bot_message_id AS "ID", 1 AS "Type", stars AS "Stars"
+                FROM     starboard_entries
+                WHERE    guild_id = $1
+                AND      bot_message_id IS NOT NULL
+                ORDER BY stars DESC
+                LIMIT    3
             )
             UNION ALL
             (
-                SELECT     t.author_id AS "ID", 2 AS "Type", COUNT(*) AS "Stars"
-                FROM       t
-                GROUP BY   t.author_id
-                ORDER BY   "Stars"
-                DESC LIMIT 3
+                SELECT   member_id AS "ID", 2 AS "Type", received AS "Stars"
+                FROM     starboard_member_stats
+                WHERE    guild_id = $1
+                AND      received > 0
+                ORDER BY received DESC
+                LIMIT    3
             )
             UNION ALL
             (
-                SELECT     t.bot_message_id AS "ID", 3 AS "Type", COUNT(*) AS "Stars"
-                FROM       t
-                WHERE      t.bot_message_id IS NOT NULL
-                GROUP BY   t.bot_message_id
-                ORDER BY   "Stars"
-                DESC LIMIT 3
+                SELECT   member_id AS "ID", 3 AS "Type", given AS "Stars"
+                FROM     starboard_member_stats
+                WHERE    guild_id = $1
+                AND      given > 0
+                ORDER BY given DESC
+                LIMIT    3
             );
         """
 
         records = await ctx.db.fetch(query, ctx.guild.id)
-        starred_posts = [r for r in records if r['Type'] == 3]
+        starred_posts = [r for r in records if r['Type'] == 1]
         embed.add_field(name='Top Starred Posts:', value=self.records_to_value(starred_posts), inline=False)
 
         to_mention = lambda o: f'<@{o}>'
 
-        star_receivers = [r for r in records if r['Type'] == 1]
+        star_receivers = [r for r in records if r['Type'] == 2]
         value = self.records_to_value(star_receivers, to_mention, default='No one!')
         embed.add_field(name='Top Star Receivers:', value=value, inline=False)
 
-        star_givers = [r for r in records if r['Type'] == 2]
+        star_givers = [r for r in records if r['Type'] == 3]
         value = self.records_to_value(star_givers, to_mention, default='No one!')
         embed.add_field(name='Top Star Givers:', value=value, inline=False)
 
+        hit_rate, saved = self.message_cache_stats
+        value = (
+            f'Message cache: {hit_rate:.1%} hit rate, {pluralize(request=saved)} to Discord saved.\n'
+            f'{pluralize(edit=self.edits_saved)} of starboard messages merged into later ones.'
+        )
+        embed.add_field(name='Discord Requests (all servers):', value=value, inline=False)
+
         await ctx.send(embed=embed)
 
     async def star_member_stats(self, ctx, member):
         embed = (discord.Embed(color=discord.Color.gold())
                  .set_author(name=member.display_name, icon_url=member.avatar_url_as(format='png')))
 
-        query = """
-            WITH t AS (
-                SELECT
-                    entry.author_id AS entry_author_id,
-                    starrers.author_id,
-                    entry.message_id
-                FROM       starrers
-                INNER JOIN starboard_entries entry
-                ON         entry.id = starrers.entry_id
-                WHERE      entry.guild_id = $1
-            )
-            (
-                SELECT     '0'::BIGINT AS "ID", COUNT(*) AS "Stars"
-                FROM       t
-                WHERE      t.entry_author_id = $2
-            )
-            UNION ALL
-            (
-                SELECT     '0'::BIGINT AS "ID", COUNT(*) AS "Stars"
-                FROM       t
-                WHERE      t.author_id = $2
-            )
-            UNION ALL
-            (
-                SELECT     t.message_id AS "ID", COUNT(*) AS "Stars"
-                FROM       t
-                WHERE      t.entry_author_id = $2
-                GROUP BY   t.message_id
-                ORDER BY   "Stars"
-                DESC LIMIT 3
-            );
-        """
-
-        records = await ctx.db.fetch(query, ctx.guild.id, member.id)
-        received = records[0]['Stars']
-        given = records[1]['Stars']
-        top_three = records[2:]
+        await self._ensure_stats(ctx)
 
-        query = 'SELECT COUNT(*) FROM starboard_entries WHERE guild_id = $1 AND author_id = $2;'
+        query = 'SELECT messages, received, given FROM starboard_member_stats WHERE guild_id = $1 AND member_id = $2;'
         record = await ctx.db.fetchrow(query, ctx.guild.id, member.id)
-        messages_starred = record[0]
+        messages_starred, received, given = record or (0, 0, 0)
+
+        query = """
+            SELECT   message_id AS "ID", stars AS "Stars"
+            FROM     starboard_entries
+            WHERE    guild_id = $1
+            AND      author_id = $2
+            ORDER BY stars DESC
+            LIMIT    3;
+        """
+        top_three = await ctx.db.fetch(query, ctx.guild.id, member.id)
 
         embed.add_field(name='Messages Starred:', value=messages_starred)
         embed.add_field(name='Stars Received:', value=received)
@@ -1025,28 +1387,25 @@ class StarBoard(commands.Cog):
     async def _star_random(self, ctx):
         """Shows a random starred message."""
 
-        query = """
-            SELECT bot_message_id
-            FROM   starboard_entries
-            WHERE  guild_id = $1
-            AND    bot_message_id IS NOT NULL
-            OFFSET FLOOR(RANDOM() * (
-                SELECT COUNT(*)
-                FROM   starboard_entries
-                WHERE  guild_id = $1
-                AND    bot_message_id IS NOT NULL
-            ))
-            LIMIT  1;
-        """
+        candidates = await self._get_random_candidates(ctx.guild.id, connection=ctx.db)
 
-        record = await ctx.db.fetchrow(query, ctx.guild.id)
-        if not record:
-            return await ctx.send('Couldn\'t find anything.')
+        # Messages that were deleted in the meantime are dropped when they're picked, so just try again.
+        for _ in range(RANDOM_ATTEMPTS):
+            if not candidates:
+                return await ctx.send('Couldn\'t find anything.')
 
-        message_id = record[0]
-        message = await self.get_message(ctx.starboard.channel, message_id)
-        if not message:
-            return await ctx.send(f'Message {message_id} has been deleted somehow.')
+            index = random.randrange(len(candidates))
+            message_id = candidates[index]
+            message = await self.get_message(ctx.starboard.channel, message_id)
+            if message:
+                break
+
+            # Swapping it with the last one makes this O(1). Someone else might have done that already though.
+            if index < len(candidates) and candidates[index] == message_id:
+                candidates[index] = candidates[-1]
+                candidates.pop()
+        else:
+            return await ctx.send('Couldn\'t find anything.')
 
         if message.embeds:
             await ctx.send(message.content, embed=message.embeds[0])
@@ -1074,7 +1433,7 @@ class StarBoard(commands.Cog):
 
         query = 'UPDATE starboard SET locked = TRUE WHERE id = $1;'
         await ctx.db.execute(query, ctx.guild.id)
-        self.get_starboard.invalidate(self, ctx.guild.id)
+        self.bot.invalidation.publish('starboard', ctx.guild.id)
 
         await ctx.send('Starboard is now locked.')
 
@@ -1092,7 +1451,7 @@ class StarBoard(commands.Cog):
 
         query = 'UPDATE starboard SET locked = FALSE WHERE id = $1;'
         await ctx.db.execute(query, ctx.guild.id)
-        self.get_starboard.invalidate(self, ctx.guild.id)
+        self.bot.invalidation.publish('starboard', ctx.guild.id)
 
         await ctx.send('Starboard is now unlocked.')
 
@@ -1117,7 +1476,7 @@ class StarBoard(commands.Cog):
         stars = min(max(stars, 1), 25)
         query = 'UPDATE starboard SET threshold = $2 WHERE id = $1;'
         await ctx.db.execute(query, ctx.guild.id, stars)
-        self.get_starboard.invalidate(self, ctx.guild.id)
+        self.bot.invalidation.publish('starboard', ctx.guild.id)
 
         await ctx.send(f'Messages now require {pluralize(**{"star": stars})} to show up in the starboard.')
 
@@ -1157,7 +1516,7 @@ class StarBoard(commands.Cog):
 
         query = f"UPDATE starboard SET max_age = '{number} {units}'::INTERVAL WHERE id = $1;"
         await ctx.db.execute(query, ctx.guild.id)
-        self.get_starboard.invalidate(self, ctx.guild.id)
+        self.bot.invalidation.publish('starboard', ctx.guild.id)
 
         if number == 1:
             age = f'1 {units[:-1]}'
@@ -19,6 +19,7 @@ from discord.ext import commands
 from . import context
 
 from utils import db
+from utils.invalidation import InvalidationBus
 from utils.jsonfile import JSONFile
 from utils.scheduler import DatabaseScheduler
 from utils.transformdict import CaseInsensitiveDict
@@ -85,12 +86,30 @@ class _UnicodeEmoji(discord.PartialEmoji):
 MAX_FORMATTER_WIDTH = 90
 
 
+class _PrefixMatcher:
+    """The prefixes of a guild, compiled into a single regex.
+
+    The alternatives are tried in order, just like discord.py does it with a list of prefixes.
+    """
+
+    __slots__ = ('prefixes', '_match')
+
+    def __init__(self, prefixes):
+        self.prefixes = tuple(prefixes)
+        self._match = re.compile('|'.join(map(re.escape, self.prefixes))).match
+
+    def match(self, content):
+        """Returns the prefix the content starts with, or None."""
+
+        match = self._match(content)
+        return match and match.group()
+
+
 def _callable_prefix(bot, message):
-    prefixes = [f'<@{bot.user.id}> ', f'<@!{bot.user.id}> ', bot.default_prefix]
-    if message.guild:
-        prefixes.extend(bot.prefixes.get(message.guild.id, []))
+    matcher = bot.get_prefix_matcher(message.guild)
 
-    return prefixes
+    # Only hand out the prefix that actually matched so discord.py doesn't have to scan all of them again.
+    return matcher.match(message.content) or matcher.prefixes
 
 
 _sentinel = object()
@@ -165,7 +184,11 @@ class ValePy(commands.AutoShardedBot):
 
         self.command_counter = collections.Counter()
         self.bot_emojis = config.emoijs
-        self.prefixes = JSONFile('prefixes.json')
+        self.prefixes = JSONFile('prefixes.json', flush_delay=5)
+        self._prefix_matchers = {}
+
+        self.invalidation = InvalidationBus()
+        self.invalidation.subscribe('prefixes', self._drop_prefix_matcher)
 
         self.session = aiohttp.ClientSession(loop=self.loop)
         self.launch = datetime.utcnow()
@@ -237,6 +260,15 @@ class ValePy(commands.AutoShardedBot):
         self._presence_task.cancel()
         await super().logout()
 
+    async def close(self):
+        # logout ends up here as well.
+        try:
+            await self.prefixes.flush()
+        except Exception as e:
+            logger.error('Flushing the prefixes failed due to %r', e)
+
+        await super().close()
+
     def add_cog(self, cog):
         super().add_cog(cog)
 
@@ -336,10 +368,32 @@ class ValePy(commands.AutoShardedBot):
     def run(self):
         super().run(config.token, reconnect=True)
 
+    def get_prefix_matcher(self, guild):
+        """Returns the compiled prefix matcher for a guild, or for DMs if guild is None."""
+
+        guild_id = guild and guild.id
+        try:
+            return self._prefix_matchers[guild_id]
+        except KeyError:
+            pass
+
+        prefixes = [f'<@{self.user.id}> ', f'<@!{self.user.id}> ', self.default_prefix]
+        if guild_id:
+            prefixes.extend(self.prefixes.get(guild_id, []))
+
+        matcher = self._prefix_matchers[guild_id] = _PrefixMatcher(prefixes)
+        return matcher
+
+    def _drop_prefix_matcher(self, guild_id):
+        self._prefix_matchers.pop(guild_id, None)
+
+    def match_prefix(self, message):
+        """Returns the prefix a message starts with, or None if it doesn't start with any."""
+
+        return self.get_prefix_matcher(message.guild).match(message.content)
+
     def get_guild_prefixes(self, guild):
-        fake_msg = discord.Object(None)
-        fake_msg.guild = guild
-        return _callable_prefix(self, fake_msg)
+        return list(self.get_prefix_matcher(guild).prefixes)
 
     def get_raw_guild_prefixes(self, guild_id):
         return self.prefixes.get(guild_id, [self.default_prefix])
@@ -350,6 +404,7 @@ class ValePy(commands.AutoShardedBot):
             raise RuntimeError('Cannot have more than 10 custom prefixes per guild.')
 
         await self.prefixes.put(guild_id, sorted(set(prefixes), reverse=True))
+        self.invalidation.publish('prefixes', guild_id)
 
     async def process_commands(self, message):
         """This overloads the original method from BotBase.
@@ -364,8 +419,11 @@ class ValePy(commands.AutoShardedBot):
                 await message.add_reaction(self.bot_emojis.get('ping_emote'))
             return
 
-        async with ctx.acquire():   # Acquire the pool from the database connection
+        # Commands acquire a connection once they use ctx.db, so those that don't never block on the pool.
+        try:
             await self.invoke(ctx)
+        finally:
+            await ctx.release()
 
     async def on_ready(self):
         logger.info(f'\n================\nLogged in as:\n{self.user.name}\n{self.user.id}\n\n================\n')
@@ -387,6 +445,9 @@ class ValePy(commands.AutoShardedBot):
 
         await self.process_commands(message)
 
+    async def on_guild_remove(self, guild):
+        self.invalidation.flush(guild.id)
+
     async def on_command(self, ctx):
         self.command_counter['total'] += 1
         if isinstance(ctx.channel, discord.abc.PrivateChannel):
@@ -416,8 +477,10 @@ class ValePy(commands.AutoShardedBot):
 
         try:
             await ctx.release()
-            async with ctx.acquire():
+            try:
                 await ctx.reinvoke()
+            finally:
+                await ctx.release()
 
         except Exception as e:
             await ctx.command.dispatch_error(ctx, e)
@@ -7,6 +7,67 @@ import discord
 from discord.ext import commands
 
 
+# The coroutine methods of asyncpg's Connection that can be used before a connection was acquired.
+_LAZY_METHODS = frozenset({
+    'execute', 'executemany', 'fetch', 'fetchrow', 'fetchval', 'prepare',
+    'copy_from_table', 'copy_from_query', 'copy_to_table', 'copy_records_to_table',
+})
+
+
+def no_connection(func):
+    """Makes a command never hold a database connection.
+
+    ctx.db will be the pool itself, so every query acquires and releases its own connection.
+    Transactions and the like can't be used then.
+    """
+
+    getattr(func, 'callback', func).__no_connection__ = True
+    return func
+
+
+class _LazyTransaction:
+    __slots__ = ('ctx', 'kwargs', 'transaction')
+
+    def __init__(self, ctx, kwargs):
+        self.ctx = ctx
+        self.kwargs = kwargs
+        self.transaction = None
+
+    async def __aenter__(self):
+        connection = await self.ctx._acquire()
+        self.transaction = connection.transaction(**self.kwargs)
+        return await self.transaction.__aenter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return await self.transaction.__aexit__(exc_type, exc, tb)
+
+
+class _LazyConnection:
+    """Stands in for ctx.db until a command actually talks to the database.
+
+    The first query acquires a connection, which is then kept until the context is released.
+    """
+
+    __slots__ = ('ctx',)
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+
+    def __getattr__(self, name):
+        if name not in _LAZY_METHODS:
+            raise AttributeError(f'{name!r} needs an acquired connection, use `await ctx.acquire()` first.')
+
+        async def method(*args, **kwargs):
+            connection = await self.ctx._acquire()
+            return await getattr(connection, name)(*args, **kwargs)
+
+        method.__name__ = name
+        return method
+
+    def transaction(self, **kwargs):
+        return _LazyTransaction(self.ctx, kwargs)
+
+
 class _ContextAcquire:
     __slots__ = ('ctx', 'timeout')
 
@@ -30,12 +91,28 @@ class Context(commands.Context):
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.db = None
+        self._db = None
+        self._lazy_db = _LazyConnection(self)
 
     @property
     def pool(self):
         return self.bot.pool
 
+    @property
+    def db(self):
+        """The database connection of this context.
+
+        No connection is acquired until the first query is made.
+        """
+
+        if self._db is not None:
+            return self._db
+
+        if getattr(getattr(self.command, 'callback', None), '__no_connection__', False):
+            return self.pool
+
+        return self._lazy_db
+
     @property
     def clean_prefix(self):
         """The cleaned up invoke prefix."""
@@ -66,14 +143,17 @@ class Context(commands.Context):
             return 'An Error occurred while trying to post content on hastebin.'
 
     async def _acquire(self, *, timeout=None):
-        if not self.db:
-            self.db = await self.pool.acquire(timeout=timeout)
+        if self._db is None:
+            self._db = await self.pool.acquire(timeout=timeout)
 
-        return self.db
+        return self._db
 
     def acquire(self, *, timeout=None):
         """Acquires the database connection from the connection pool.
 
+        Usually ctx.db does this on its own when it's used the first time.
+        This is only needed for things that the lazy connection doesn't support, like get_server_version.
+
         Can be either used as async context manager: ::
             async with ctx.acquire():
                 await ctx.db.execute(...)
@@ -94,9 +174,9 @@ class Context(commands.Context):
         This method is called automatically by the bot, NOT Context.release!
         """
 
-        if self.db:
-            await self.pool.release(self.db)
-            self.db = None
+        if self._db is not None:
+            await self.pool.release(self._db)
+            self._db = None
 
     async def release(self):
         """Closes the current database session.
@@ -138,13 +218,11 @@ class Context(commands.Context):
         if reacquire:
             await self.release()
 
+        # The connection is acquired again once it's used.
         try:
             data = await self.bot.wait_for('raw_reaction_add', check=check, timeout=timeout)
             return str(data.emoji) == str(confirm_emoji)
         finally:
-            if reacquire:
-                await self.acquire()
-
             if delete_after:
                 await msg.delete()
 
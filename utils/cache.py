@@ -1,11 +1,27 @@
 import asyncio
+import collections
 import functools
 import inspect
+import sys
+import time
+import weakref
 
 from lru import LRU
 
 _keyword_marker = object()
 
+CacheStats = collections.namedtuple('CacheStats', 'hits misses coalesced')
+
+# qualified name -> wrapper of every function that was decorated with cache().
+# Reloading an extension simply replaces the entries of its functions.
+_registry = weakref.WeakValueDictionary()
+
+
+def all_caches():
+    """Returns a dict of the qualified names and wrappers of all cached functions."""
+
+    return dict(sorted(_registry.items()))
+
 
 #  Key-making functions
 def unordered(args, kwargs):
@@ -19,24 +35,131 @@ default_key = functools.partial(functools._make_key, typed=False)
 typed_key = functools.partial(functools._make_key, typed=True)
 
 
+def _sizeof(obj, depth=3):
+    """Roughly estimates the memory an object takes up, including what it contains up to a certain depth."""
+
+    size = sys.getsizeof(obj)
+    if depth <= 0 or isinstance(obj, (str, bytes)):
+        return size
+
+    depth -= 1
+    if hasattr(obj, 'items'):
+        size += sum(_sizeof(key, depth) + _sizeof(value, depth) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_sizeof(item, depth) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += _sizeof(vars(obj), depth)
+
+    return size
+
+
 # Here's the original: https://github.com/Rapptz/RoboDanny/blob/rewrite/cogs/utils/cache.py
 # Modified to allow custom key args and the strategy is determined by the max_size
-def cache(max_size=128, make_key=default_key):
+def cache(max_size=128, make_key=default_key, *, ttl=None, max_memory=None, stale_while_revalidate=False):
+    """Caches the results of a function or coroutine.
+
+    If max_size is None, the cache is unbounded, otherwise the least recently used entries are evicted.
+    If a ttl is given, entries are considered stale after that many seconds and will be recomputed.
+    The ttl can also be a callable that returns the number of seconds (or None for no expiry) for each value.
+
+    If max_memory is given, the least recently used entries are also evicted once the estimated size
+    of all entries exceeds that many bytes.
+
+    With stale_while_revalidate, a coroutine returns a stale entry right away and refreshes it in the background.
+
+    Concurrent calls of a coroutine with the same key share a single computation. If it fails, nothing is cached.
+    """
+
     def decorator(func):
-        if max_size is None:
-            cache = {}
-            get_stats = lambda: (0, 0)
-        else:
+        if max_size is not None:
             cache = LRU(max_size)
-            get_stats = cache.get_stats
+        elif max_memory is not None:
+            # We need to know which entry was used least recently to stay within the budget.
+            cache = collections.OrderedDict()
+        else:
+            cache = {}
 
-        def wrap_and_store(key, coro):
-            async def func():
-                value = await coro
-                cache[key] = value
-                return value
+        # key -> asyncio.Task of a computation that is still running.
+        pending = {}
+        stats = collections.Counter()
+
+        # key -> time.monotonic() deadline. Entries without one never expire.
+        deadlines = {}
+        # key -> estimated size in bytes. Only used if a max_memory was given.
+        sizes = {}
+
+        refresh_in_background = stale_while_revalidate and asyncio.iscoroutinefunction(func)
+
+        def forget(key):
+            deadlines.pop(key, None)
+            stats['memory'] -= sizes.pop(key, 0)
+
+        if max_size is not None:
+            cache.set_callback(lambda key, _: forget(key))
+
+        def evict_least_recently_used():
+            if max_size is not None:
+                key, _ = cache.peek_last_item()
+            else:
+                key = next(iter(cache))
+
+            del cache[key]
+            forget(key)
+
+        def store(key, value):
+            cache[key] = value
+
+            seconds = ttl(value) if callable(ttl) else ttl
+            if seconds is not None:
+                deadlines[key] = time.monotonic() + seconds
+            else:
+                deadlines.pop(key, None)
+
+            if max_memory is not None:
+                size = _sizeof(key) + _sizeof(value)
+                stats['memory'] += size - sizes.get(key, 0)
+                sizes[key] = size
+
+                while stats['memory'] > max_memory and len(cache) > 1:
+                    evict_least_recently_used()
+
+        def lookup(key):
+            """Returns the value and whether it is still fresh."""
+
+            value = cache[key]
+            if max_size is None and max_memory is not None:
+                cache.move_to_end(key)
+
+            deadline = deadlines.get(key)
+            if deadline is not None and deadline < time.monotonic():
+                if refresh_in_background:
+                    return value, False
+
+                del cache[key]
+                forget(key)
+                raise KeyError(key)
+
+            return value, True
+
+        def start(key, coro):
+            task = asyncio.ensure_future(coro)
+            pending[key] = task
 
-            return func()
+            def done(task):
+                # If the entry was invalidated in the meantime, the result might be outdated already.
+                if pending.get(key) is not task:
+                    return
+
+                del pending[key]
+                if not task.cancelled() and task.exception() is None:
+                    store(key, task.result())
+
+            task.add_done_callback(done)
+            return task
+
+        async def wait_for(task):
+            # A caller being cancelled must not cancel the computation for everyone else.
+            return await asyncio.shield(task)
 
         def wrap_new(value):
             async def new_coro():
@@ -50,34 +173,74 @@ def cache(max_size=128, make_key=default_key):
 
             # Probably faster to use cache.get and compare to a sentinel
             try:
-                value = cache[key]
+                value, fresh = lookup(key)
             except KeyError:
+                task = pending.get(key)
+                if task is not None:
+                    stats['coalesced'] += 1
+                    return wait_for(task)
+
+                stats['misses'] += 1
                 value = func(*args, **kwargs)
 
                 if inspect.isawaitable(value):
-                    return wrap_and_store(key, value)
+                    return wait_for(start(key, value))
 
-                cache[key] = value
+                store(key, value)
                 return value
             else:
+                stats['hits'] += 1
+                if not fresh and key not in pending:
+                    start(key, func(*args, **kwargs))
+
                 if asyncio.iscoroutinefunction(func):
                     return wrap_new(value)
 
                 return value
 
+        def clear():
+            cache.clear()
+            pending.clear()
+            deadlines.clear()
+            sizes.clear()
+            stats['memory'] = 0
+
+        def resize(size):
+            if max_size is None:
+                raise ValueError('Unbounded caches cannot be resized.')
+
+            # Evicted entries are passed to the callback, so their sizes and deadlines are dropped as well.
+            cache.set_size(size)
+
+        def get_memory():
+            if max_memory is not None:
+                return stats['memory']
+
+            return sum(_sizeof(key) + _sizeof(value) for key, value in cache.items())
+
         def invalidate(*args, **kwargs):
+            key = make_key(args, kwargs)
+            pending.pop(key, None)
+
             try:
-                del cache[make_key(args, kwargs)]
+                del cache[key]
             except KeyError:
                 return False
             else:
                 return True
+            finally:
+                forget(key)
 
         wrapper.cache = cache
         wrapper.get_key = lambda *args, **kwargs: make_key(args, kwargs)
         wrapper.invalidate = invalidate
-        wrapper.get_stats = get_stats
+        wrapper.get_stats = lambda: CacheStats(stats['hits'], stats['misses'], stats['coalesced'])
+        wrapper.get_memory = get_memory
+        wrapper.clear = clear
+        wrapper.resize = resize
+        wrapper.get_size = lambda: max_size if max_size is None else cache.get_size()
 
+        _registry[f'{func.__module__}.{func.__qualname__}'] = wrapper
         return wrapper
 
     return decorator
@@ -64,7 +64,6 @@ async def disambiguate(ctx, matches, transform=str, *, tries=3):
         raise commands.BadArgument('Too many tries. Goodbye.')
     finally:
         await message.delete()
-        await ctx.acquire()
 
 
 class _DisambiguateExampleGenerator:
@@ -0,0 +1,42 @@
+import collections
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidationBus:
+    """Tells caches that the data of a guild has changed.
+
+    Writers publish a namespace (e.g. 'starboard') together with the ID of the guild they changed,
+    everything that caches data of that namespace subscribes to it and drops its entry for the guild.
+    """
+
+    def __init__(self):
+        self._subscribers = collections.defaultdict(list)
+
+    def subscribe(self, namespace, callback):
+        """Registers a callback that is called with the guild ID whenever the namespace is published."""
+
+        self._subscribers[namespace].append(callback)
+
+    def unsubscribe(self, namespace, callback):
+        """Removes a callback again. Cogs should do this when they're unloaded."""
+
+        callbacks = self._subscribers.get(namespace, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+
+    def publish(self, namespace, guild_id):
+        """Invalidates everything of a namespace that was cached for a guild."""
+
+        for callback in list(self._subscribers.get(namespace, ())):
+            try:
+                callback(guild_id)
+            except Exception as e:
+                logger.error('Invalidating %s for guild %s with %r failed due to %r', namespace, guild_id, callback, e)
+
+    def flush(self, guild_id):
+        """Invalidates everything that was cached for a guild, e.g. after the bot left it."""
+
+        for namespace in list(self._subscribers):
+            self.publish(namespace, guild_id)
@@ -2,9 +2,12 @@ import asyncio
 import collections
 import contextlib
 import json
+import logging
 import os
 import uuid
 
+logger = logging.getLogger(__name__)
+
 JSON_PATH = 'jsonfiles/'
 os.makedirs(JSON_PATH, exist_ok=True)
 
@@ -14,13 +17,28 @@ class JSONFile(collections.abc.MutableMapping):
     """Yeah, well. This is actually shit that is used instead of a DB.
 
     Why? Because I'm cool and I can and this will save my ass on things a lot of querying would happen. Ez.
+
+    Changes made through put and remove are appended to a journal next to the actual file,
+    so a write only costs as much as the change itself. Loading replays the journal on top of the file
+    and once the journal gets too long, it is compacted back into the file.
+
+    If a flush_delay is given, changes are only written every flush_delay seconds at most.
+    Everything that changed in the meantime is coalesced into a single write, so make sure to call flush before shutting down.
     """
 
     _transform_key = str
 
     def __init__(self, name, **options):
         self._name = JSON_PATH + name
+        self._journal_name = f'{self._name}.journal'
         self._db = {}
+        self._journal_size = 0
+        self._compact_after = options.pop('compact_after', 1000)
+
+        self._flush_delay = options.pop('flush_delay', None)
+        self._flusher = None
+        self._pending = {}
+        self._stats = collections.Counter()
 
         self._loop = options.pop('loop', asyncio.get_event_loop())
         self._lock = asyncio.Lock()
@@ -44,33 +62,144 @@ class JSONFile(collections.abc.MutableMapping):
     def __len__(self):
         return len(self._db)
 
+    def _replay(self):
+        with open(self._journal_name, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    key, *value = json.loads(line)
+                except ValueError:
+                    # We crashed in the middle of an append. Everything after that can't be trusted.
+                    return False
+
+                if value:
+                    self._db[key] = value[0]
+                else:
+                    self._db.pop(key, None)
+
+                self._journal_size += 1
+
+        return True
+
     def _load(self):
         with contextlib.suppress(FileNotFoundError), open(self._name, 'r') as f:
             self._db.update(json.load(f))
 
+        with contextlib.suppress(FileNotFoundError):
+            if not self._replay():
+                self._compact()
+
     async def load(self):
         async with self._lock:
             await self._loop.run_in_executor(None, self._load)
 
+    @staticmethod
+    def _fsync_directory(path):
+        # Makes sure a rename survives a crash. Not every platform allows opening directories, though.
+        with contextlib.suppress(OSError):
+            fd = os.open(os.path.dirname(path) or '.', os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
     def _dump(self):
         temp = f'{self._name}-{uuid.uuid4()}.tmp'
         with open(temp, 'w', encoding='utf-8') as tmp:
             json.dump(self._db.copy(), tmp, ensure_ascii=True, sort_keys=True, indent=4, separators=(',', ':'))
+            tmp.flush()
+            os.fsync(tmp.fileno())
 
         os.replace(temp, self._name)
+        self._fsync_directory(self._name)
+
+    def _compact(self):
+        self._dump()
+
+        # If we die right here, the journal is just replayed on top of the already up-to-date file, which is harmless.
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._journal_name)
+        self._journal_size = 0
+
+    def _append(self, lines):
+        with open(self._journal_name, 'a', encoding='utf-8') as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._journal_size += len(lines)
+        if self._journal_size >= self._compact_after:
+            self._compact()
+
+    async def _write(self, lines):
+        async with self._lock:
+            await self._loop.run_in_executor(None, self._append, lines)
+
+        self._stats['flushes'] += 1
+
+    async def _log(self, key, *value):
+        key = str(key)
+        line = json.dumps([key, *value], ensure_ascii=True, separators=(',', ':'))
+        self._stats['changes'] += 1
+
+        if self._flush_delay is None:
+            await self._write([f'{line}\n'])
+            return
+
+        # Only the latest change of a key matters, the journal doesn't care about the order of different keys.
+        self._pending[key] = f'{line}\n'
+        if self._flusher is None:
+            self._flusher = self._loop.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        try:
+            await asyncio.sleep(self._flush_delay)
+        finally:
+            self._flusher = None
+
+        try:
+            await self.flush()
+        except Exception as e:
+            # The changes are still pending, the next change or flush will try again.
+            logger.error('Flushing %d changes to %s failed due to %r', len(self._pending), self._name, e)
+
+    async def flush(self):
+        """Writes all pending changes to the disk."""
+
+        if not self._pending:
+            return
+
+        pending = self._pending.copy()
+        await self._write(list(pending.values()))
+
+        # Only now they are safe. Keys that were changed again during the write stay pending.
+        for key, line in pending.items():
+            if self._pending.get(key) is line:
+                del self._pending[key]
+
+        logger.debug('Flushed %d changes to %s, %d writes saved so far.', len(pending), self._name, self.flushes_saved)
+
+    @property
+    def flushes_saved(self):
+        """The number of disk writes that were saved by coalescing changes."""
+
+        return self._stats['changes'] - self._stats['flushes']
 
     async def save(self):
+        """Writes the whole file and clears the journal."""
+
+        # The new file contains everything that is still pending.
+        self._pending.clear()
         async with self._lock:
-            await self._loop.run_in_executor(None, self._dump)
+            await self._loop.run_in_executor(None, self._compact)
 
     async def put(self, key, value):
         """Edits a config entry."""
 
         self[key] = value
-        await self.save()
+        await self._log(key, value)
 
     async def remove(self, key):
         """Removes a config entry."""
 
         del self[key]
-        await self.save()
+        await self._log(key)
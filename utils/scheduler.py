@@ -1,9 +1,13 @@
 import asyncio
 import collections
+import contextlib
 import datetime
+import heapq
 import json
 import logging
+import math
 import time
+import uuid
 
 from .misc import maybe_awaitable
 from . import db
@@ -12,6 +16,12 @@ logger = logging.getLogger(__name__)
 
 MAX_SLEEP_TIME = 60 * 60 * 24
 SHORT_TASK_DURATION = 60
+WHEEL_RESOLUTION = 0.1
+WHEEL_SLOTS = 1024
+# Seconds until timers that another process claimed are checked again, in case it failed to dispatch them.
+CLAIM_RECHECK_DELAY = 30
+# Seconds between two resyncs with the database, in case notifications were missed.
+RESYNC_INTERVAL = 5 * 60
 
 
 class Scheduler(db.Table):
@@ -20,7 +30,7 @@ class Scheduler(db.Table):
 
     event = db.Column(db.Text)
     created = db.Column(db.Timestamp, default="now() at time zone 'utc'")
-    args_kwargs = db.Column(db.JSON, default="'{}'::jsonb")
+    args_kwargs = db.Column(db.JSONB, default="'{}'::jsonb")
 
     schedule_expires_index = db.Index(expires)
 
@@ -39,8 +49,11 @@ class _Entry(collections.namedtuple('_Entry', 'time event args kwargs created id
     def from_record(cls, record):
         """Returns an instance of this class from a database record. This is just for internal purposes."""
 
-        # I swear I'm gonna kill someone for this line
-        args_kwargs = json.loads(record['args_kwargs'])
+        # The JSONB codec of the pool already decodes the column.
+        args_kwargs = record['args_kwargs']
+        if isinstance(args_kwargs, str):
+            # Tables that were created before args_kwargs became JSONB still return plain JSON text.
+            args_kwargs = json.loads(args_kwargs)
 
         return cls(
             time=record['expires'],
@@ -78,6 +91,78 @@ class _Entry(collections.namedtuple('_Entry', 'time event args kwargs created id
         return self.seconds <= SHORT_TASK_DURATION
 
 
+class _TimingWheel:
+    """A hashed timing wheel for short timers.
+
+    Instead of one sleeping task per timer, the timers are put into buckets of WHEEL_RESOLUTION seconds
+    and a single loop.call_at tick collects the expired ones. Adding a timer is O(1) and the wheel only
+    ticks as long as it actually holds timers.
+    """
+
+    def __init__(self, callback, *, loop, resolution=WHEEL_RESOLUTION, slots=WHEEL_SLOTS):
+        self._callback = callback
+        self._loop = loop
+        self._resolution = resolution
+        self._slots = [[] for _ in range(slots)]
+        self._start = 0
+        self._tick = 0
+        self._size = 0
+        self._handle = None
+
+    def __len__(self):
+        return self._size
+
+    def add(self, delay, entry):
+        now = self._loop.time()
+        if not self._size:
+            self._start = now
+            self._tick = 0
+
+        # Timers that are further away than one revolution stay in their slot for more rounds.
+        tick = max(math.ceil((now + delay - self._start) / self._resolution), self._tick + 1)
+        self._slots[tick % len(self._slots)].append((tick, entry))
+        self._size += 1
+
+        if self._handle is None:
+            self._schedule()
+
+    def clear(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+        for slot in self._slots:
+            slot.clear()
+        self._size = 0
+
+    def _schedule(self):
+        when = self._start + (self._tick + 1) * self._resolution
+        self._handle = self._loop.call_at(when, self._advance)
+
+    def _advance(self):
+        self._handle = None
+        current = int((self._loop.time() - self._start) / self._resolution)
+
+        # If the loop was blocked for a while, we have to catch up on the ticks we missed.
+        expired = []
+        while self._tick < current:
+            self._tick += 1
+            slot = self._slots[self._tick % len(self._slots)]
+            if not slot:
+                continue
+
+            pending = [item for item in slot if item[0] > self._tick]
+            expired.extend(entry for tick, entry in slot if tick <= self._tick)
+            slot[:] = pending
+
+        self._size -= len(expired)
+        if self._size:
+            self._schedule()
+
+        if expired:
+            self._callback(expired)
+
+
 class BaseScheduler:
     """Manages timing-related things.
 
@@ -94,6 +179,8 @@ class BaseScheduler:
         self._current = None
         self._runner = None
         self._callbacks = []
+        self._wakeup = asyncio.Event()
+        self._wheel = _TimingWheel(self._on_short_timers, loop=self._loop)
 
     def __del__(self):
         self.close()
@@ -116,29 +203,53 @@ class BaseScheduler:
     async def _cleanup(self):
         pass
 
+    async def _wait_for(self, timer):
+        """Sleeps until the timer is due.
+
+        Returns False if the sleep was interrupted by _restart because the timer might not be the next one anymore.
+        """
+
+        self._wakeup.clear()
+        delta = self._calculate_delta(timer.time, self.time_function())
+
+        logger.debug('Sleeping for %s seconds', delta)
+
+        while delta > 0:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), min(MAX_SLEEP_TIME, delta))
+            except asyncio.TimeoutError:
+                delta = self._calculate_delta(timer.time, self.time_function())
+            else:
+                return False
+
+        return True
+
     async def _update(self):
         while True:
             self._current = timer = await self._get()
-            now = self.time_function()
-            delta = self._calculate_delta(timer.time, now)
-
-            logger.debug('Sleeping for %s seconds', delta)
-
-            while delta > 0:
-                await asyncio.sleep(min(MAX_SLEEP_TIME, delta))
-                delta -= MAX_SLEEP_TIME
+            if not await self._wait_for(timer):
+                continue
 
             logger.debug('Entry %r done, dispatching now.', timer)
-            await self._dispatch(self._current)
+            await self._dispatch_due(self._current)
+
+    async def _dispatch_due(self, timer):
+        # Subclasses may dispatch every other timer that is due at this point as well.
+        await self._dispatch(timer)
 
     def _restart(self):
-        self._runner.cancel()
-        self._runner = self._loop.create_task(self._update())
+        # Wakes up the runner so it picks up the next timer again. Much cheaper than recreating the task.
+        self._wakeup.set()
+
+    def _on_short_timers(self, timers):
+        # One task per tick instead of one per timer.
+        self._loop.create_task(self._dispatch_short(timers))
 
-    async def _short_task_optimization(self, event):
-        # Maybe use self._loop.call_later?
-        await asyncio.sleep(event.seconds)
-        await self._dispatch(event)
+    async def _dispatch_short(self, timers):
+        for timer in timers:
+            # Errors are already logged by _dispatch.
+            with contextlib.suppress(Exception):
+                await self._dispatch(timer)
 
     async def add_abs(self, when, action, args=(), kwargs=None, id=None):
         """Enter a new event in the queue at an absolute time.
@@ -149,7 +260,7 @@ class BaseScheduler:
         kwargs = kwargs or {}
         event = _Entry(when, action, args, kwargs, None, id)    # Remove id param
         if event.short:
-            self._loop.create_task(self._short_task_optimization(event))
+            self._wheel.add(event.seconds, event)
             return
 
         await self._put(event)
@@ -226,6 +337,7 @@ class BaseScheduler:
         """Closes the running task, and does any cleanup if necessary."""
 
         self.stop()
+        self._wheel.clear()
         self._loop.create_task(self._cleanup())
         del self._callbacks[:]
         self._current = None
@@ -235,14 +347,35 @@ class DatabaseScheduler(BaseScheduler):
     """An implementation of a Scheduler where a database is used.
 
     Only DBMSs that support JSON types are supported (basically just PostgreSQL but nvm).
+
+    To not query the database after every single dispatch, the upcoming timers are fetched in batches
+    and kept in a heap. Everything up to the latest timer of the batch is mirrored in the heap, timers that
+    are added later than that stay in the database until the next batch is fetched.
+
+    Several processes can share one scheduler table. Inserts and deletes are announced via LISTEN/NOTIFY
+    so every process keeps its heap up to date, and due timers are claimed with FOR UPDATE SKIP LOCKED
+    so each of them is dispatched by exactly one process.
     """
 
-    def __init__(self, pool, *, safe_mode=True, **kwargs):
+    def __init__(self, pool, *, safe_mode=True, batch_size=100, max_concurrency=50, channel='scheduler', **kwargs):
         super().__init__(**kwargs)
         self._pool = pool
         self._safe = safe_mode
         self._have_data = asyncio.Event()
 
+        self._batch_size = batch_size
+        self._heap = []
+        self._ids = set()        # The IDs of all timers in the heap that haven't been removed.
+        self._horizon = None     # The latest time of the last batch.
+        self._exhausted = False  # True if the last batch contained everything that is in the database.
+        self._refilling = False
+        self._max_concurrency = max_concurrency
+
+        self._channel = channel
+        self._origin = uuid.uuid4().hex  # To tell our own notifications apart from the ones of other processes.
+        self._listener = None
+        self._resync_handle = None
+
     async def _dispatch(self, timer):
         await super()._dispatch(timer)
 
@@ -253,42 +386,294 @@ class DatabaseScheduler(BaseScheduler):
     def _calculate_delta(time1, time2):
         return (time1 - time2).total_seconds()
 
-    async def _get_entry(self):
-        query = 'SELECT * FROM scheduler ORDER BY expires LIMIT 1;'
-        return await self._pool.fetchrow(query)
+    async def _update(self):
+        await self._listen()
+        try:
+            await super()._update()
+        finally:
+            await self._unlisten()
+
+    async def _listen(self):
+        if self._listener is not None:
+            return
+
+        self._listener = await self._pool.acquire()
+        await self._listener.add_listener(self._channel, self._on_notification)
+        self._resync_handle = self._loop.call_later(RESYNC_INTERVAL, self._resync)
+
+    async def _unlisten(self):
+        if self._resync_handle is not None:
+            self._resync_handle.cancel()
+            self._resync_handle = None
+
+        listener, self._listener = self._listener, None
+        if listener is None:
+            return
+
+        try:
+            await listener.remove_listener(self._channel, self._on_notification)
+        finally:
+            await self._pool.release(listener)
+
+    def _on_notification(self, connection, pid, channel, payload):
+        payload = json.loads(payload)
+        if payload['origin'] == self._origin:
+            return
+
+        if payload['op'] == 'insert':
+            expires = datetime.datetime.utcfromtimestamp(payload['expires'])
+            self._loop.create_task(self._on_insert(payload['id'], expires))
+        elif payload['op'] == 'delete':
+            self._ids.discard(payload['id'])
+            if self._current and self._current.id == payload['id']:
+                self._restart()
+
+    def _resync(self):
+        # Notifications get lost if the listener connection drops, so every now and then
+        # we forget what we know about the database and fetch everything that is due again.
+        self._exhausted = False
+        self._horizon = None
+        self._have_data.set()
+        self._restart()
+
+        self._resync_handle = self._loop.call_later(RESYNC_INTERVAL, self._resync)
+
+    def _recheck(self, entries):
+        # The process that claimed them might have rolled back or died.
+        self._requeue(entries)
+        self._have_data.set()
+        self._restart()
+
+    def _in_window(self, time):
+        return self._exhausted or self._refilling or (self._horizon is not None and time <= self._horizon)
+
+    async def _on_insert(self, id, expires):
+        # Timers past the horizon are picked up by a later batch anyway.
+        if not self._in_window(expires):
+            return
+
+        record = await self._pool.fetchrow('SELECT * FROM scheduler WHERE id = $1;', id)
+        if record is None:
+            # Already dispatched or removed.
+            return
+
+        self._push(_Entry.from_record(record))
+        self._have_data.set()
+
+        if self._current and expires <= self._current.time:
+            self._restart()
+
+    def _push(self, entry):
+        if entry.id in self._ids:
+            return
+
+        self._ids.add(entry.id)
+        heapq.heappush(self._heap, (entry.time, entry.id, entry))
+
+    def _peek(self):
+        heap = self._heap
+        while heap:
+            _, id, entry = heap[0]
+            if id in self._ids:
+                return entry
+
+            # Removed in the meantime.
+            heapq.heappop(heap)
+
+        return None
+
+    def _needs_refill(self, entry):
+        if self._exhausted:
+            return False
+
+        # Past the horizon, there might be timers in the database that are due earlier.
+        return entry is None or self._horizon is None or entry.time > self._horizon
+
+    async def _refill(self):
+        query = 'SELECT * FROM scheduler ORDER BY expires, id LIMIT $1;'
+
+        self._refilling = True
+        try:
+            records = await self._pool.fetch(query, self._batch_size)
+        finally:
+            self._refilling = False
+
+        for record in records:
+            self._push(_Entry.from_record(record))
+
+        self._exhausted = len(records) < self._batch_size
+        self._horizon = records[-1]['expires'] if records else None
+
+        logger.debug('Fetched %d timers from the database.', len(records))
 
     async def _get(self):
         while True:
-            entry = await self._get_entry()
+            entry = self._peek()
+            if self._needs_refill(entry):
+                await self._refill()
+                entry = self._peek()
+
             if entry:
                 self._have_data.set()
-                return _Entry.from_record(entry)
+                return entry
 
             self._have_data.clear()
             self._current = None
             await self._have_data.wait()
 
+    async def _fetch_overdue(self, now):
+        # Everything before the horizon is in the heap already, no need to fetch and decode it again.
+        query = """
+            SELECT   *
+            FROM     scheduler
+            WHERE    ($1::TIMESTAMP IS NULL OR expires >= $1)
+            AND      expires <= $2
+            ORDER BY expires, id;
+        """
+        records = await self._pool.fetch(query, self._horizon, now)
+
+        for record in records:
+            self._push(_Entry.from_record(record))
+
+        self._horizon = now
+        logger.debug('Fetched %d overdue timers from the database.', len(records))
+
+    def _pop_due(self, now):
+        due = []
+        while True:
+            entry = self._peek()
+            if entry is None or entry.time > now:
+                return due
+
+            # The ID stays in self._ids until the row is deleted, so a concurrent batch can't bring it back.
+            heapq.heappop(self._heap)
+            due.append(entry)
+
+    def _requeue(self, entries):
+        # _push would skip them because their IDs are still known. Those that were removed in the meantime stay gone.
+        for entry in entries:
+            if entry.id in self._ids:
+                heapq.heappush(self._heap, (entry.time, entry.id, entry))
+
+    async def _dispatch_due(self, timer):
+        now = self.time_function()
+        if not self._exhausted and (self._horizon is None or now > self._horizon):
+            await self._fetch_overdue(now)
+
+        due = self._pop_due(now)
+        if not due:
+            return
+
+        ids = [entry.id for entry in due]
+        try:
+            busy = await self._claim_and_dispatch(due, ids)
+        except Exception as e:
+            # The transaction was rolled back, so the rows are still there.
+            self._requeue(due)
+            if self._safe:
+                self.stop()
+
+            logger.error('Dispatching %d timers failed due to %r', len(ids), e)
+            raise
+        else:
+            # Timers we couldn't claim are being dispatched by another process.
+            # Once it's done, it notifies us about the deletes, until then we keep an eye on them.
+            self._ids.difference_update(set(ids) - busy)
+            if busy:
+                self._loop.call_later(CLAIM_RECHECK_DELAY, self._recheck, [entry for entry in due if entry.id in busy])
+
+    async def _claim_and_dispatch(self, due, ids):
+        """Dispatches the timers that no other process claimed.
+
+        Returns the IDs of those that are locked by another process right now.
+        """
+
+        claim = 'SELECT id FROM scheduler WHERE id = ANY($1::INTEGER[]) FOR UPDATE SKIP LOCKED;'
+        exists = 'SELECT id FROM scheduler WHERE id = ANY($1::INTEGER[]);'
+        delete = """
+            WITH timer AS (
+                DELETE FROM scheduler
+                WHERE       id = ANY($1::INTEGER[])
+                RETURNING   id
+            )
+            SELECT pg_notify($2, json_build_object('origin', $3::TEXT, 'op', 'delete', 'id', id)::TEXT)
+            FROM   timer;
+        """
+
+        async with self._pool.acquire() as connection:
+            async with connection.transaction():
+                claimed = {record[0] for record in await connection.fetch(claim, ids)}
+
+                # Timers that were dispatched by someone else already are gone, the others are still being worked on.
+                unclaimed = [id for id in ids if id not in claimed]
+                busy = {record[0] for record in await connection.fetch(exists, unclaimed)} if unclaimed else set()
+                if not claimed:
+                    return busy
+
+                logger.debug('Dispatching %d timers at once.', len(claimed))
+
+                entries = (entry for entry in due if entry.id in claimed)
+
+                async def worker():
+                    for entry in entries:
+                        # Errors are already logged by _dispatch. One broken timer must not hold back the others.
+                        with contextlib.suppress(Exception):
+                            await BaseScheduler._dispatch(self, entry)
+
+                await asyncio.gather(*(worker() for _ in range(min(self._max_concurrency, len(claimed)))))
+
+                # The rows stay locked until the transaction commits, so nobody else can dispatch them in the meantime.
+                await connection.execute(delete, list(claimed), self._channel, self._origin)
+
+        return busy
+
     async def _put(self, entry):
         query = """
-            INSERT INTO scheduler (created, event, expires, args_kwargs)
-            VALUES      ($1, $2, $3, $4::JSONB);
+            WITH timer AS (
+                INSERT INTO scheduler (created, event, expires, args_kwargs)
+                VALUES      ($1, $2, $3, $4::JSONB)
+                RETURNING   id, expires
+            )
+            SELECT id, pg_notify($5, json_build_object(
+                'origin', $6::TEXT, 'op', 'insert', 'id', id, 'expires', extract(epoch FROM expires)
+            )::TEXT)
+            FROM timer;
         """
-        await self._pool.execute(
+        id = await self._pool.fetchval(
             query,
             entry.created,
             entry.event,
             entry.time,
             {'args': entry.args, 'kwargs': entry.kwargs},
+            self._channel,
+            self._origin,
         )
+
+        # Timers past the horizon are picked up by a later batch. While a batch is being fetched,
+        # we don't know the horizon yet, but pushing a timer too much never hurts.
+        if self._in_window(entry.time):
+            self._push(entry._replace(id=id))
+
         self._have_data.set()
 
     async def _remove(self, entry):
         try:
-            query = 'DELETE FROM scheduler WHERE id = $1;'
-            await self._pool.execute(query, entry.id)
+            query = """
+                WITH timer AS (
+                    DELETE FROM scheduler
+                    WHERE       id = $1
+                    RETURNING   id
+                )
+                SELECT pg_notify($2, json_build_object('origin', $3::TEXT, 'op', 'delete', 'id', id)::TEXT)
+                FROM   timer;
+            """
+            await self._pool.execute(query, entry.id, self._channel, self._origin)
         except Exception as e:
             if self._safe:
                 self.stop()
 
             logger.error('Removing %r failed due to %r', entry, e)
             raise
+        else:
+            # Only after the row is gone, otherwise a concurrent batch could bring it back.
+            self._ids.discard(entry.id)